@@ -1,62 +1,165 @@
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
-from datetime import datetime
-import os
-from routes.auth import auth_bp
-# Create Flask app
-app = Flask(__name__)
-
-# Configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///mfa_auth.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
+from sqlalchemy import event
+import atexit
+import logging
+import logging.handlers
+import importlib
+import queue
 
+from config import config, ENV
 # ✅ Import extensions from extensions.py
-from extensions import db, jwt
-
-# ✅ Initialize extensions with app
-db.init_app(app)
-jwt.init_app(app)
-
-# ✅ CORS Configuration
-CORS(app, resources={
-    r"/api/*": {
-        "origins": ["http://localhost:3000", "http://127.0.0.1:3000"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Type", "Authorization"],
-        "supports_credentials": True,
-        "max_age": 3600
-    }
-})
-
-# ✅ Import models AFTER db is initialized
-with app.app_context():
-    from models import User, BackupCode, LoginHistory
-    
-    try:
+from extensions import db, jwt, ORJSONProvider
+
+
+_HEALTH_PATHS = ('/health', '/api/health')
+_HEALTH_BODY = b'{"status":"ok"}'
+
+
+def _health_middleware(wsgi_app):
+    """Answer liveness probes before Flask routing and request setup"""
+    def middleware(environ, start_response):
+        if environ.get('PATH_INFO') in _HEALTH_PATHS and environ.get('REQUEST_METHOD') == 'GET':
+            start_response('200 OK', [
+                ('Content-Type', 'application/json'),
+                ('Content-Length', str(len(_HEALTH_BODY))),
+            ])
+            return [_HEALTH_BODY]
+        return wsgi_app(environ, start_response)
+    return middleware
+
+
+_log_listener = None
+
+
+def _configure_logging(level):
+    """Route log records through a queue; a listener thread does the stderr writes"""
+    global _log_listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _log_listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+    )
+    log_queue = queue.Queue(-1)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _log_listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+
+def _set_sqlite_pragma(dbapi_connection, _connection_record):
+    """WAL lets readers run alongside the writer; NORMAL syncs at checkpoints only"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")  # wait for the write lock instead of failing
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+# (module, blueprint attribute, url prefix)
+BLUEPRINTS = (
+    ('routes.auth', 'auth_bp', '/api/auth'),
+    ('routes.user', 'user_bp', '/api/user'),
+)
+
+
+def _register_blueprints(app):
+    for module_name, attr, url_prefix in BLUEPRINTS:
+        blueprint = getattr(importlib.import_module(module_name), attr)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+
+def create_app(config_name=None, test_config=None):
+    """Application factory (test_config overrides individual settings)"""
+    app = Flask(__name__)
+
+    # Configuration
+    config_name = config_name or ENV.get('FLASK_ENV', 'default')
+    app.config.from_object(config[config_name])
+    if test_config:
+        app.config.from_mapping(test_config)
+
+    # ✅ Connection pool sizing for server databases (not for a SQLite file)
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(app.config['DB_POOL_OPTIONS'])
+
+    # ✅ Debug output is gated by LOG_LEVEL; handlers run off the request thread
+    _configure_logging(app.config['LOG_LEVEL'])
+
+    # ✅ Serialize request/response JSON with orjson when available
+    app.json = ORJSONProvider(app)
+
+    # ✅ Initialize extensions with app
+    db.init_app(app)
+    jwt.init_app(app)
+
+    # ✅ SQLite: WAL journal + relaxed fsync for the dev/test database
+    with app.app_context():
+        if db.engine.url.get_backend_name() == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragma)
+
+    # ✅ CORS Configuration
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": ["http://localhost:3000", "http://127.0.0.1:3000"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["Content-Type", "Authorization"],
+            "supports_credentials": True,
+            "max_age": app.config['CORS_MAX_AGE']
+        }
+    })
+
+    # ✅ Answer CORS preflights before any other request hooks or views run;
+    # Flask-CORS adds the Access-Control-* headers to this response
+    @app.before_request
+    def cors_preflight():
+        if request.method == 'OPTIONS':
+            return app.make_default_options_response()
+
+    # ✅ Import models AFTER db is initialized
+    import models  # noqa: F401
+
+    # ✅ Per-app service settings (read from app.extensions, not cached globally)
+    from services.device_fingerprint import device_service
+    from services import token_blocklist
+    device_service.init_app(app)
+    token_blocklist.init_app(app)
+
+    # ✅ Schema is created on demand (`flask init-db`); only dev auto-creates it
+    @app.cli.command('init-db')
+    def init_db():
+        """Create all database tables"""
         db.create_all()
         print("✅ Database tables created successfully")
-    except Exception as e:
-        print(f"❌ Database error: {str(e)}")
 
-# ✅ Import and register blueprints
-from routes.auth import auth_bp
-from routes.user import user_bp
+    if app.config.get('FLASK_ENV') == 'development':
+        with app.app_context():
+            try:
+                db.create_all()
+            except Exception as e:
+                app.logger.error("❌ Database error: %s", e)
 
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(user_bp, url_prefix='/api/user')
+    # ✅ Import and register blueprints (only once extensions are configured)
+    _register_blueprints(app)
 
-# Health check endpoint
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    return {'status': 'ok', 'timestamp': datetime.utcnow().isoformat()}, 200
+    # Connection pool metrics: opt-in, for deployments where /metrics is only
+    # reachable from the monitoring network
+    if app.config['METRICS_ENABLED']:
+        @app.route('/metrics', methods=['GET'])
+        def metrics():
+            return {'db_pool': db.engine.pool.status()}, 200
 
-# Root endpoint
-@app.route('/')
-def index():
-    return {
+    # Root endpoint (static payload, serialized once)
+    index_body = app.json.dumps({
         'message': 'MFA Authentication API',
         'version': '1.0.0',
         'endpoints': {
@@ -64,9 +167,21 @@ def index():
             'user': '/api/user',
             'health': '/api/health'
         }
-    }, 200
+    })
+
+    @app.route('/')
+    def index():
+        return app.response_class(index_body, mimetype='application/json')
+
+    # Health checks (/health, /api/health) are answered by the WSGI middleware
+    app.wsgi_app = _health_middleware(app.wsgi_app)
+
+    return app
+
 
 if __name__ == '__main__':
+    app = create_app()
+
     print("\n" + "="*60)
     print("🚀 Starting MFA Authentication Server")
     print("="*60)
@@ -74,5 +189,6 @@ if __name__ == '__main__':
     print(f"📍 API Base: http://localhost:5000/api")
     print(f"📍 Frontend: http://localhost:3000")
     print("="*60 + "\n")
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
+
+    # Development server only; production runs wsgi:app under gunicorn
+    app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,14 @@
+"""
+ASGI entrypoint for running the backend under Uvicorn workers.
+
+    uvicorn asgi:application --workers 4 --host 0.0.0.0 --port 5000
+
+The Flask app stays WSGI; asgiref adapts it and runs each request in its
+thread pool, so blocking work (bcrypt, DB commits, biometric extraction)
+never stalls the event loop.
+"""
+from asgiref.wsgi import WsgiToAsgi
+
+from wsgi import app
+
+application = WsgiToAsgi(app)
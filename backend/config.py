@@ -1,60 +1,85 @@
 import os
 from datetime import timedelta
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Single read-only snapshot of the environment (after .env is applied)
+ENV = MappingProxyType(dict(os.environ))
+
 class Config:
     """Base configuration"""
     # Flask
-    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-    FLASK_ENV = os.getenv('FLASK_ENV', 'development')
+    SECRET_KEY = ENV.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    FLASK_ENV = ENV.get('FLASK_ENV', 'development')
     
     # Database
-    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///mfa_auth.db')
+    SQLALCHEMY_DATABASE_URI = ENV.get('DATABASE_URL', 'sqlite:///mfa_auth.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
+    # Applied by create_app() for server databases only; SQLite keeps its default
+    # pool, since extra connections to one file just contend for the write lock
+    DB_POOL_OPTIONS = {
+        'pool_size': int(ENV.get('DB_POOL_SIZE', 20)),
+        'max_overflow': int(ENV.get('DB_MAX_OVERFLOW', 30)),
+        'pool_timeout': 10,
+        'pool_recycle': 1800,  # recycle before server-side idle timeouts
+        'pool_pre_ping': True,
+    }
+    METRICS_ENABLED = ENV.get('METRICS_ENABLED', 'false').lower() == 'true'  # unauthenticated /metrics
     
     # JWT
     # JWT
-    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
+    JWT_SECRET_KEY = ENV.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)  # ✅ Changed from 1 hour to 24 hours
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)  # 30 days
+    JWT_BLOCKLIST_REFRESH = int(ENV.get('JWT_BLOCKLIST_REFRESH', 30))  # seconds before other workers see a logout
 
     # CORS
-    CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
+    CORS_ORIGINS = ENV.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
+    CORS_MAX_AGE = int(ENV.get('CORS_MAX_AGE', 86400))  # cache preflight for 24 hours
+    
+    # Logging
+    LOG_LEVEL = ENV.get('LOG_LEVEL', 'INFO')
     
     # Security
-    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    BCRYPT_LOG_ROUNDS = int(ENV.get('BCRYPT_LOG_ROUNDS', 12))
     
     # Face Recognition
-    FACE_RECOGNITION_MODEL = os.getenv('FACE_RECOGNITION_MODEL', 'VGG-Face')
-    FACE_DETECTOR_BACKEND = os.getenv('FACE_DETECTOR_BACKEND', 'opencv')
-    FACE_DISTANCE_METRIC = os.getenv('FACE_DISTANCE_METRIC', 'cosine')
-    FACE_RECOGNITION_THRESHOLD = float(os.getenv('FACE_RECOGNITION_THRESHOLD', 0.6))
+    FACE_RECOGNITION_MODEL = ENV.get('FACE_RECOGNITION_MODEL', 'VGG-Face')
+    FACE_DETECTOR_BACKEND = ENV.get('FACE_DETECTOR_BACKEND', 'opencv')
+    FACE_DISTANCE_METRIC = ENV.get('FACE_DISTANCE_METRIC', 'cosine')
+    FACE_RECOGNITION_THRESHOLD = float(ENV.get('FACE_RECOGNITION_THRESHOLD', 0.6))
+    FACE_WORKERS = int(ENV.get('FACE_WORKERS', 0))  # encoder processes per server worker (wsgi.py)
+    FACE_ENCODE_TIMEOUT = float(ENV.get('FACE_ENCODE_TIMEOUT', 30))  # seconds before encoding inline
     
     # Voice Recognition
-    VOICE_RECOGNITION_THRESHOLD = float(os.getenv('VOICE_RECOGNITION_THRESHOLD', 0.7))
-    VOICE_SAMPLE_RATE = int(os.getenv('VOICE_SAMPLE_RATE', 16000))
+    VOICE_RECOGNITION_THRESHOLD = float(ENV.get('VOICE_RECOGNITION_THRESHOLD', 0.7))
+    VOICE_SAMPLE_RATE = int(ENV.get('VOICE_SAMPLE_RATE', 16000))
     
     # OTP
-    OTP_ISSUER_NAME = os.getenv('OTP_ISSUER_NAME', 'MFA Auth System')
-    OTP_VALIDITY_WINDOW = int(os.getenv('OTP_VALIDITY_WINDOW', 2))
+    OTP_ISSUER_NAME = ENV.get('OTP_ISSUER_NAME', 'MFA Auth System')
+    OTP_VALIDITY_WINDOW = int(ENV.get('OTP_VALIDITY_WINDOW', 2))
     
     # Device Fingerprint
-    DEVICE_TRUST_DURATION = int(os.getenv('DEVICE_TRUST_DURATION', 2592000))  # 30 days
+    DEVICE_TRUST_DURATION = int(ENV.get('DEVICE_TRUST_DURATION', 2592000))  # 30 days
     
     # File Upload
-    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
-    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'stored_faces')
-    ALLOWED_EXTENSIONS = set(os.getenv('ALLOWED_EXTENSIONS', 'jpg,jpeg,png').split(','))
+    MAX_CONTENT_LENGTH = int(ENV.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
+    UPLOAD_FOLDER = ENV.get('UPLOAD_FOLDER', 'stored_faces')
+    ALLOWED_EXTENSIONS = set(ENV.get('ALLOWED_EXTENSIONS', 'jpg,jpeg,png').split(','))
     
     # Rate Limiting
-    RATELIMIT_STORAGE_URL = os.getenv('RATELIMIT_STORAGE_URL', 'memory://')
-    RATELIMIT_DEFAULT = os.getenv('RATELIMIT_DEFAULT', '100 per hour')
+    RATELIMIT_STORAGE_URL = ENV.get('RATELIMIT_STORAGE_URL', 'memory://')
+    RATELIMIT_DEFAULT = ENV.get('RATELIMIT_DEFAULT', '100 per hour')
+    LOGIN_RATE_LIMIT = int(ENV.get('LOGIN_RATE_LIMIT', 10))  # attempts per IP+email
+    LOGIN_RATE_WINDOW = int(ENV.get('LOGIN_RATE_WINDOW', 60))  # seconds
+    MFA_FAILURE_LIMIT = int(ENV.get('MFA_FAILURE_LIMIT', 10))  # failed MFA attempts per user
+    MFA_FAILURE_WINDOW = int(ENV.get('MFA_FAILURE_WINDOW', 60))  # seconds
     
     # Backup Codes
-    BACKUP_CODES_COUNT = int(os.getenv('BACKUP_CODES_COUNT', 10))
+    BACKUP_CODES_COUNT = int(ENV.get('BACKUP_CODES_COUNT', 10))
 
 
 class DevelopmentConfig(Config):
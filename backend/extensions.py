@@ -2,9 +2,79 @@
 Shared extensions for the Flask application.
 This prevents circular imports and SQLAlchemy instance conflicts.
 """
+from datetime import date
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to Flask's stdlib json provider if orjson is not installed
+    orjson = None
+
+
+def _engine_json_options():
+    """Let the engine parse JSON columns with orjson when it is installed"""
+    if orjson is None:
+        return {}
+    return {
+        'json_serializer': lambda obj: orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode(),
+        'json_deserializer': orjson.loads,
+    }
+
+
 # Initialize extensions (but don't bind to app yet)
-db = SQLAlchemy()
+# db.session is a scoped_session keyed on the app context, so each request
+# (and each worker thread) already gets its own Session. Objects stay loaded
+# after commit so responses built from them don't issue a refresh SELECT.
+db = SQLAlchemy(
+    session_options={'expire_on_commit': False},
+    engine_options=_engine_json_options(),
+)
 jwt = JWTManager()
+
+
+@jwt.token_in_blocklist_loader
+def _token_revoked(_jwt_header, jwt_payload):
+    """Tokens revoked on logout, checked against the app's in-memory blocklist"""
+    return current_app.extensions['token_blocklist'].is_revoked(jwt_payload['jti'])
+
+
+def _json_default(o):
+    # Dates go out as ISO 8601 on both paths, matching orjson's native output
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for jsonify() and request.get_json()."""
+
+    default = staticmethod(_json_default)
+
+    def _dumpb(self, obj):
+        return orjson.dumps(
+            obj,
+            default=self.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return self._dumpb(obj).decode()
+
+    def response(self, *args, **kwargs):
+        # jsonify() and dict returns: hand orjson's bytes straight to the
+        # response instead of decoding to str and re-encoding
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumpb(obj), mimetype=self.mimetype)
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -1,9 +1,25 @@
-from app import app, db
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
 from models import User
 
-with app.app_context():
-    users = User.query.all()
-    
+load_dotenv()
+
+# Query the database directly instead of booting the whole Flask app
+url = make_url(os.environ.get('DATABASE_URL', 'sqlite:///mfa_auth.db'))
+if url.drivername.startswith('sqlite') and url.database and url.database != ':memory:' \
+        and not os.path.isabs(url.database):
+    # Flask-SQLAlchemy resolves relative SQLite paths against the instance folder
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    url = url.set(database=os.path.join(backend_dir, 'instance', url.database))
+
+with Session(create_engine(url)) as session:
+    users = session.scalars(select(User)).all()
+
     if users:
         print(f"\n📋 Found {len(users)} user(s) in database:\n")
         for user in users:
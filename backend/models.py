@@ -1,37 +1,93 @@
 from extensions import db
 from datetime import datetime
+from flask import current_app
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import hmac
+import logging
 import secrets
 
+logger = logging.getLogger(__name__)
+
+
+class utcnow(FunctionElement):
+    """Current time as naive UTC, evaluated by the database.
+
+    func.now() follows the session time zone on PostgreSQL and MySQL; this
+    renders each dialect's UTC clock so DB-side stamps match the naive UTC
+    datetimes the routes bind (datetime.utcnow()).
+    """
+    type = db.DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utcnow, 'sqlite')
+def _utcnow_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP is UTC on SQLite but whole seconds; keep milliseconds
+    return "(STRFTIME('%Y-%m-%d %H:%M:%f', 'now'))"
+
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+@compiles(utcnow, 'mysql')
+def _utcnow_mysql(element, compiler, **kw):
+    return '(UTC_TIMESTAMP(6))'
+
+
+def upsert_insert():
+    """The bound dialect's insert() with on_conflict_do_update, or None if it has none"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
 
 class User(db.Model):
     __tablename__ = 'users'
 
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    username = db.Column(db.String(80), unique=True, index=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, index=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     full_name = db.Column(db.String(150))
 
-    # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Timestamps (naive UTC, filled in by the database; see utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(),
+                           onupdate=utcnow())
     last_login = db.Column(db.DateTime)
 
     # Account Status
     is_active = db.Column(db.Boolean, default=True)
     is_verified = db.Column(db.Boolean, default=False)
 
+    # Biometric templates below are deferred: loaded only when a query asks
+    # for them (load_only in the verify routes), never on a plain User fetch
+
     # Face Recognition
     face_enrolled = db.Column(db.Boolean, default=False)
-    face_encoding = db.Column(db.Text)
+    face_encoding = db.deferred(db.Column(db.LargeBinary))  # float32 bytes (legacy rows: JSON text)
     face_image_path = db.Column(db.String(255))
     face_enrolled_at = db.Column(db.DateTime, nullable=True)
 
     # Voice Recognition
     voice_enrolled = db.Column(db.Boolean, default=False)
-    voice_embedding = db.Column(db.Text)
+    voice_embedding = db.deferred(db.Column(db.LargeBinary))  # legacy; features are stored in VoiceTemplate
 
     # OTP/TOTP
     otp_enrolled = db.Column(db.Boolean, default=False)
@@ -39,41 +95,53 @@ class User(db.Model):
 
     # Gesture Recognition
     gesture_enrolled = db.Column(db.Boolean, default=False)
-    gesture_features = db.Column(db.Text, nullable=True)
+    gesture_features = db.deferred(db.Column(db.LargeBinary, nullable=True))
     gesture_enrolled_at = db.Column(db.DateTime, nullable=True)
 
     # Keystroke Dynamics
     keystroke_enrolled = db.Column(db.Boolean, default=False)
     keystroke_enrolled_at = db.Column(db.DateTime, nullable=True)
     keystroke_passphrase = db.Column(db.String(255), nullable=True)
-    keystroke_features = db.Column(db.Text, nullable=True)
+    keystroke_features = db.deferred(db.Column(db.JSON(none_as_null=True), nullable=True))  # enrollment profile
     keystroke_last_updated = db.Column(db.DateTime, nullable=True)
 
     # Relationships
     backup_codes = db.relationship('BackupCode', backref='user', lazy=True, cascade='all, delete-orphan')
     login_history = db.relationship('LoginHistory', backref='user', lazy=True, cascade='all, delete-orphan')
 
+    # (method name, enrollment flag) in the order methods are offered to the client
+    MFA_METHODS = (
+        ('face', 'face_enrolled'),
+        ('voice', 'voice_enrolled'),
+        ('gesture', 'gesture_enrolled'),
+        ('keystroke', 'keystroke_enrolled'),
+        ('totp', 'otp_enrolled'),
+    )
+
     # Methods
+    def enrolled_methods(self):
+        """Names of the MFA methods this user has enrolled"""
+        return [name for name, flag in self.MFA_METHODS if getattr(self, flag)]
+
     def set_password(self, password):
         """Hash and set password"""
         self.password_hash = generate_password_hash(password)
-        print(f"🔑 [PASSWORD] Set for user: {self.username}")
+        logger.debug("[PASSWORD] Set for user: %s", self.username)
 
     def check_password(self, password):
         """Check if password is correct"""
         result = check_password_hash(self.password_hash, password)
-        print(f"🔍 [PASSWORD CHECK] User: {self.username}, Result: {result}")
+        logger.debug("[PASSWORD CHECK] User: %s, Result: %s", self.username, result)
         return result
 
     def generate_backup_codes(self, count=10):
         """Generate backup codes for the user"""
-        codes = []
-        for _ in range(count):
-            code = BackupCode.generate_code()
-            codes.append(code)
-            backup_code = BackupCode(user_id=self.id)
-            backup_code.set_code(code)
-            db.session.add(backup_code)
+        codes = [BackupCode.generate_code() for _ in range(count)]
+        # One executemany INSERT instead of a unit-of-work flush per row
+        db.session.execute(
+            BackupCode.__table__.insert(),
+            [{'user_id': self.id, 'code_hash': BackupCode.hash_code(code)} for code in codes],
+        )
         return codes
 
     def to_dict(self):
@@ -87,26 +155,55 @@ class User(db.Model):
             'gesture_enrolled': self.gesture_enrolled,
             'keystroke_enrolled': self.keystroke_enrolled,
             'otp_enrolled': self.otp_enrolled,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None,
+            # datetimes are ISO-formatted by the app's JSON provider
+            'created_at': self.created_at,
+            'last_login': self.last_login,
         }
 
 
+# Columns read by User.to_dict(); biometric blobs are loaded only where needed
+PROFILE_COLUMNS = (
+    User.id, User.username, User.email,
+    User.face_enrolled, User.voice_enrolled, User.gesture_enrolled,
+    User.keystroke_enrolled, User.otp_enrolled,
+    User.created_at, User.last_login,
+)
+
+
 class BackupCode(db.Model):
     __tablename__ = 'backup_codes'
+    __table_args__ = (
+        # verify_backup_code looks codes up by owner + HMAC
+        db.Index('ix_backup_codes_user_hash', 'user_id', 'code_hash'),
+        # get_backup_codes counts total/used per owner from the index alone
+        db.Index('ix_backup_codes_user_used', 'user_id', 'is_used'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     code_hash = db.Column(db.String(255), nullable=False)
     is_used = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
     used_at = db.Column(db.DateTime, nullable=True)
 
+    @staticmethod
+    def hash_code(code):
+        """HMAC-SHA256 of a backup code, keyed with the app secret.
+
+        Backup codes are random and single-use, so a slow password KDF
+        adds latency without adding security.
+        """
+        key = current_app.config['SECRET_KEY'].encode()
+        return hmac.new(key, code.encode(), hashlib.sha256).hexdigest()
+
     def set_code(self, code):
-        self.code_hash = generate_password_hash(code)
+        self.code_hash = BackupCode.hash_code(code)
 
     def check_code(self, code):
-        return check_password_hash(self.code_hash, code)
+        # Codes issued before the HMAC switch are stored as werkzeug hashes
+        if '$' in self.code_hash:
+            return check_password_hash(self.code_hash, code)
+        return hmac.compare_digest(self.code_hash, BackupCode.hash_code(code))
 
     @staticmethod
     def generate_code():
@@ -114,13 +211,72 @@ class BackupCode(db.Model):
         return secrets.token_urlsafe(6)[:8].upper()
 
 
+class DeviceFingerprint(db.Model):
+    """Browsers/devices a user has signed in from (see services.device_fingerprint)"""
+    __tablename__ = 'device_fingerprints'
+    __table_args__ = (
+        # One row per user + device; the ON CONFLICT target of the upsert
+        db.UniqueConstraint('user_id', 'fingerprint_hash', name='uq_device_user_fingerprint'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    fingerprint_hash = db.Column(db.String(64), nullable=False)  # SHA-256 hex
+    device_name = db.Column(db.String(200))
+    device_type = db.Column(db.String(20))  # mobile, tablet, desktop
+    browser = db.Column(db.String(100))
+    os = db.Column(db.String(100))
+    ip_address = db.Column(db.String(45))  # IPv6 support
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), nullable=False)
+    last_seen = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), nullable=False)
+
+    # Trust: no expiry (NULL) means trusted until revoked
+    is_trusted = db.Column(db.Boolean, default=False, nullable=False)
+    trust_expires_at = db.Column(db.DateTime, nullable=True)
+
+    def is_trust_valid(self):
+        """True if the device is trusted and its trust has not expired"""
+        if not self.is_trusted:
+            return False
+        return self.trust_expires_at is None or self.trust_expires_at > datetime.utcnow()
+
+    def to_dict(self):
+        """Convert to dictionary for API response"""
+        return {
+            'id': self.id,
+            'device_name': self.device_name,
+            'device_type': self.device_type,
+            'browser': self.browser,
+            'os': self.os,
+            'ip_address': self.ip_address,
+            'created_at': self.created_at,
+            'last_seen': self.last_seen,
+            'is_trusted': self.is_trust_valid(),
+            'trust_expires_at': self.trust_expires_at,
+        }
+
+
+class RevokedToken(db.Model):
+    """JWTs revoked before they expire (logout); rows are pruned once exp passes"""
+    __tablename__ = 'revoked_tokens'
+
+    jti = db.Column(db.String(36), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
 class LoginHistory(db.Model):
     """Model to track login attempts - FIXED VERSION"""
     __tablename__ = 'login_history'
+    __table_args__ = (
+        # Covers WHERE user_id = ? ORDER BY login_time DESC LIMIT n; SQLite and
+        # Postgres walk an ascending index backwards, so no DESC key is needed
+        db.Index('ix_loginhistory_user_time', 'user_id', 'login_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    login_time = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    login_time = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(),
+                           nullable=False, index=True)
     ip_address = db.Column(db.String(45))  # IPv6 support
     user_agent = db.Column(db.String(500))
     success = db.Column(db.Boolean, default=True, nullable=False)
@@ -133,7 +289,7 @@ class LoginHistory(db.Model):
         return {
             'id': self.id,
             'user_id': self.user_id,
-            'login_time': self.login_time.isoformat() if self.login_time else None,
+            'login_time': self.login_time,
             'ip_address': self.ip_address,
             'user_agent': self.user_agent,
             'success': self.success,
@@ -154,20 +310,21 @@ class VoiceTemplate(db.Model):
         unique=True,  # one template per user
     )
 
-    # Serialized feature vector from voice_recognition.py
-    features = db.Column(db.Text, nullable=False)
+    # Serialized float32 feature vector from voice_recognition.py
+    features = db.Column(db.LargeBinary, nullable=False)
 
-    # JSON string with meta info: duration, quality, etc.
-    meta_json = db.Column(db.Text, nullable=True)
+    # Meta info (duration, quality, etc.); (de)serialized by the engine
+    meta_json = db.Column(db.JSON(none_as_null=True), nullable=True)
 
     # Optional path to stored raw audio file
     audio_path = db.Column(db.String(512), nullable=True)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), nullable=False)
     updated_at = db.Column(
         db.DateTime,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        default=utcnow(),
+        server_default=utcnow(),
+        onupdate=utcnow(),
         nullable=False,
     )
 
@@ -175,3 +332,22 @@ class VoiceTemplate(db.Model):
         'User',
         backref=db.backref('voice_template', uselist=False, cascade='all, delete-orphan'),
     )
+
+    @classmethod
+    def upsert(cls, user_id, features, meta_json, audio_path):
+        """Insert or replace a user's template in one statement (keyed on user_id)"""
+        values = {'features': features, 'meta_json': meta_json, 'audio_path': audio_path}
+        insert = upsert_insert()
+        if insert is None:
+            # No portable ON CONFLICT; fall back to select-then-write
+            template = cls.query.filter_by(user_id=user_id).first() or cls(user_id=user_id)
+            for key, value in values.items():
+                setattr(template, key, value)
+            db.session.add(template)
+            return
+
+        stmt = insert(cls).values(user_id=user_id, **values)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[cls.user_id],
+            set_={**{key: stmt.excluded[key] for key in values}, 'updated_at': utcnow()},
+        ))
@@ -1,23 +1,89 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g, current_app
 from extensions import db
-from models import User, BackupCode, LoginHistory, VoiceTemplate
+from models import User, BackupCode, PROFILE_COLUMNS
+from services.last_login import last_login_buffer
+from services.login_history import login_history_writer
+from services.rate_limiter import login_rate_limiter, mfa_failure_limiter
+from services import get_voice
+from services.embedding_cache import embedding_cache
+from services.token_blocklist import current_blocklist
+from services.verify_cache import verify_cache
+from utils.log_sampling import log_exception
+from services.face_recognition import face_service
+from services.gesture_recognition import gesture_service
+from services.keystroke_service import keystroke_analyzer, verify_keystroke_pattern
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
+    decode_token,
     jwt_required,
+    get_jwt,
     get_jwt_identity,
 )
-from datetime import datetime, timedelta
+from sqlalchemy import or_, update
+from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from collections import OrderedDict
+from datetime import datetime
+import base64
+import hashlib
+import hmac
 import secrets
-import jwt as pyjwt
-import json
-
-from services.voice_recognition import (
-    voice_service_v2,
-    SecurityProfile,
-)
+import threading
+import time
+import logging
+import pyotp
 
 auth_bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------------------------
+# TOTP helpers
+# -------------------------------------------------------------------
+
+# Accepted drift either side of the current step (3 x 30s = 90s)
+TOTP_VALID_WINDOW = 3
+
+
+# Accepted codes per (secret digest, time step); keyed by a digest so the
+# cache never holds TOTP secrets, and entries age out as the step advances
+_TOTP_CACHE_SIZE = 10_000
+_totp_cache = OrderedDict()
+_totp_cache_lock = threading.Lock()
+
+
+def _totp_codes(totp, time_step):
+    """Codes accepted during one time step"""
+    key = (hashlib.blake2b(totp.secret.encode(), digest_size=16).digest(), time_step)
+    with _totp_cache_lock:
+        codes = _totp_cache.get(key)
+        if codes is not None:
+            _totp_cache.move_to_end(key)
+            return codes
+    codes = tuple(
+        totp.generate_otp(time_step + offset).encode()
+        for offset in range(-TOTP_VALID_WINDOW, TOTP_VALID_WINDOW + 1)
+    )
+    with _totp_cache_lock:
+        _totp_cache[key] = codes
+        if len(_totp_cache) > _TOTP_CACHE_SIZE:
+            _totp_cache.popitem(last=False)
+    return codes
+
+
+def verify_totp(secret, otp_code):
+    """Constant-time check of a TOTP code against the current window"""
+    totp = pyotp.TOTP(secret)
+    otp_code = str(otp_code)
+    # compare_digest() raises on non-ASCII str; anything but N ASCII digits is wrong anyway
+    if len(otp_code) != totp.digits or not (otp_code.isascii() and otp_code.isdigit()):
+        return False
+    time_step = int(time.time()) // totp.interval
+    otp_code = otp_code.encode()
+    return any(hmac.compare_digest(otp_code, code) for code in _totp_codes(totp, time_step))
+
 
 # -------------------------------------------------------------------
 # MFA token helpers
@@ -26,54 +92,189 @@ auth_bp = Blueprint('auth', __name__)
 MFA_TOKEN_SECRET = 'mfa-secret-key-change-in-production'
 MFA_TOKEN_EXPIRY = 300  # 5 minutes
 
+# Signing key and JOSE header are fixed, so prepare them once
+_MFA_KEY = MFA_TOKEN_SECRET.encode()
+_MFA_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=')
+# Keyed HMAC state (ipad/opad already absorbed); each signature works on a copy
+_MFA_HMAC = hmac.new(_MFA_KEY, digestmod=hashlib.sha256)
+
+# Verified MFA tokens -> (user_id, exp), evicted LRU and on expiry
+_MFA_CACHE_SIZE = 4096
+_mfa_cache = OrderedDict()
+_mfa_cache_lock = threading.Lock()
+
+# Checked against when the email is unknown, so both branches cost one hash
+_DUMMY_PASSWORD_HASH = generate_password_hash(secrets.token_urlsafe(16))
+
+
+def _b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64url_decode(data):
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+def _mfa_signature(signing_input):
+    mac = _MFA_HMAC.copy()
+    mac.update(signing_input)
+    return mac.digest()
+
 
 def create_mfa_token(user_id):
-    payload = {
-        'user_id': user_id,
-        'exp': datetime.utcnow() + timedelta(seconds=MFA_TOKEN_EXPIRY),
-        'iat': datetime.utcnow(),
-    }
-    return pyjwt.encode(payload, MFA_TOKEN_SECRET, algorithm='HS256')
+    # Compact HS256 JWT; same wire format as PyJWT, without its per-call key setup
+    now = int(time.time())
+    claims = {'user_id': user_id, 'exp': now + MFA_TOKEN_EXPIRY, 'iat': now}
+    signing_input = _MFA_HEADER + b'.' + _b64url_encode(
+        current_app.json.dumps(claims).encode()
+    )
+    signature = _mfa_signature(signing_input)
+    return (signing_input + b'.' + _b64url_encode(signature)).decode()
+
+
+def _verify_mfa_token(token):
+    """Check an HS256 MFA token's signature and return its claims (no exp check)."""
+    try:
+        signing_input, _, signature = token.encode().rpartition(b'.')
+        header, _, payload = signing_input.partition(b'.')
+        if header != _MFA_HEADER and (
+            current_app.json.loads(_b64url_decode(header)).get('alg') != 'HS256'
+        ):
+            return None
+        expected = _mfa_signature(signing_input)
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            return None
+        claims = current_app.json.loads(_b64url_decode(payload))
+        return claims if 'user_id' in claims and 'exp' in claims else None
+    except (AttributeError, TypeError, ValueError):
+        return None
 
 
 def decode_mfa_token(token):
-    try:
-        payload = pyjwt.decode(token, MFA_TOKEN_SECRET, algorithms=['HS256'])
-        return payload['user_id']
-    except pyjwt.ExpiredSignatureError:
-        raise Exception('MFA token expired. Please login again.')
-    except pyjwt.InvalidTokenError:
+    # MFA tokens are reused across verification retries; verify each one once
+    now = time.time()
+    with _mfa_cache_lock:
+        hit = _mfa_cache.get(token)
+        if hit is not None:
+            user_id, exp = hit
+            if now < exp:
+                _mfa_cache.move_to_end(token)
+                return user_id
+            del _mfa_cache[token]
+            raise Exception('MFA token expired. Please login again.')
+    payload = _verify_mfa_token(token)
+    if payload is None:
         raise Exception('Invalid MFA token')
+    if now >= payload['exp']:
+        raise Exception('MFA token expired. Please login again.')
+    with _mfa_cache_lock:
+        _mfa_cache[token] = (payload['user_id'], payload['exp'])
+        if len(_mfa_cache) > _MFA_CACHE_SIZE:
+            _mfa_cache.popitem(last=False)
+    return payload['user_id']
+
+
+
+# MFA verification endpoints whose JSON body carries an mfa_token
+_MFA_ENDPOINTS = frozenset({
+    'auth.verify_face',
+    'auth.mfa_verify_voice',
+    'auth.verify_otp',
+    'auth.verify_backup_code',
+    'auth.verify_gesture',
+    'auth.verify_keystroke',
+})
+
+
+@auth_bp.before_request
+def preload_mfa_identity():
+    """Decode the request's MFA token once and bind the result to g."""
+    if request.endpoint not in _MFA_ENDPOINTS:
+        return
+    token = (request.get_json(silent=True) or {}).get('mfa_token')
+    if not token:
+        return  # handlers report the missing token themselves
+    try:
+        g.mfa_user_id = decode_mfa_token(token)
+    except Exception as e:
+        g.mfa_token_error = e
+        return
+    
+    # Users under a guessing attack are turned away before any extraction runs
+    if mfa_failure_limiter.exceeded(
+        f"mfa:fail:{g.mfa_user_id}",
+        current_app.config['MFA_FAILURE_LIMIT'],
+        current_app.config['MFA_FAILURE_WINDOW'],
+    ):
+        logger.warning("[MFA] Too many failed attempts for user %s", g.mfa_user_id)
+        return jsonify({'error': 'Too many failed attempts. Please try again later.'}), 429
+
+
+def mfa_user_id():
+    """user_id from the request's MFA token; raises the decode error if it was invalid."""
+    if 'mfa_token_error' in g:
+        raise g.mfa_token_error
+    return g.get('mfa_user_id')
+
+
+def log_login_attempt(user_id, method_type, success, confidence=None, failure_reason=None):
+    """Queue a login attempt for LoginHistory and track MFA failures; non-fatal on errors."""
+    failure_key = f"mfa:fail:{user_id}"
+    if success:
+        mfa_failure_limiter.reset(failure_key)
+    else:
+        mfa_failure_limiter.hit(
+            failure_key,
+            current_app.config['MFA_FAILURE_LIMIT'],
+            current_app.config['MFA_FAILURE_WINDOW'],
+        )
+    try:
+        login_history_writer.submit(current_app._get_current_object(), {
+            'user_id': user_id,
+            'login_time': datetime.utcnow(),
+            'ip_address': request.remote_addr,
+            'user_agent': request.headers.get('User-Agent'),
+            'method_type': method_type,
+            'success': bool(success),
+            'confidence': float(confidence) if confidence is not None else None,
+            'failure_reason': failure_reason,
+        })
+    except Exception as e:
+        # Never break the authentication flow over an audit record
+        logger.warning("[LOG] Failed to record login attempt: %s", e)
 
 
+def issue_token_pair(user_id):
+    """Access + refresh tokens for a fully authenticated user.
 
-def log_login_attempt(user_id, method_type, success, confidence=None):
-    """Helper to record a login attempt in LoginHistory; non-fatal on errors."""
-    try:
-        record = LoginHistory(
-            user_id=user_id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            method_type=method_type,  # ✅ FIXED
-            success=bool(success)
-        )
-        # Attach optional confidence if the model supports it (safe attempt)
-        if confidence is not None:
-            try:
-                setattr(record, 'confidence', float(confidence))
-            except Exception:
-                # Model may not have a 'confidence' field; ignore silently
-                pass
+    Both are built by flask_jwt_extended so identity/claims loaders apply.
+    """
+    return create_access_token(identity=user_id), create_refresh_token(identity=user_id)
 
-        db.session.add(record)
-        db.session.commit()
-    except Exception as e:
-        # Rollback to keep DB consistent and avoid breaking authentication flow
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-        print(f"❌ [LOG] Failed to record login attempt: {e}")
+
+def _load_user(user_id, *columns, options=()):
+    """Load a user with the to_dict() columns plus only the extra columns given."""
+    return db.session.get(
+        User, user_id, options=[load_only(*PROFILE_COLUMNS, *columns), *options]
+    )
+
+
+def _claim_backup_code(code_id):
+    """Flip one unused backup code to used; False if it was already redeemed."""
+    result = db.session.execute(
+        update(BackupCode)
+        .where(BackupCode.id == code_id, BackupCode.is_used.is_(False))
+        .values(is_used=True, used_at=datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+def touch_last_login(user):
+    """Stamp user.last_login; the row itself is written by the periodic flusher."""
+    stamp = datetime.utcnow()
+    last_login_buffer.mark(current_app._get_current_object(), user.id, stamp)
+    # Keep the loaded instance in sync without marking it dirty
+    set_committed_value(user, 'last_login', stamp)
 
 
 # ===========================
@@ -91,11 +292,15 @@ def register():
         if not data or not all(k in data for k in ['username', 'email', 'password']):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        # Check if user already exists
-        if User.query.filter_by(email=data['email']).first():
+        # Check if user already exists (email or username, one query)
+        existing = User.query.with_entities(User.email, User.username).filter(
+            or_(User.email == data['email'], User.username == data['username'])
+        ).all()
+        
+        if any(row.email == data['email'] for row in existing):
             return jsonify({'error': 'Email already registered'}), 400
         
-        if User.query.filter_by(username=data['username']).first():
+        if existing:
             return jsonify({'error': 'Username already taken'}), 400
         
         # Create new user
@@ -114,10 +319,9 @@ def register():
         db.session.commit()
         
         # Generate tokens for auto-login
-        access_token = create_access_token(identity=new_user.id)
-        refresh_token = create_refresh_token(identity=new_user.id)
+        access_token, refresh_token = issue_token_pair(new_user.id)
         
-        print(f"✅ [REGISTER] User created: {new_user.username}")
+        logger.info("[REGISTER] User created: %s", new_user.username)
         
         # ✅ Return backup codes along with tokens
         return jsonify({
@@ -130,9 +334,7 @@ def register():
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [REGISTER] Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[REGISTER] Error: %s", e)
         return jsonify({'error': 'Registration failed'}), 500
 
 
@@ -148,66 +350,60 @@ def login():
         data = request.get_json()
         
         # ✅ Add debug logging
-        print("\n" + "="*60)
-        print("🔐 [LOGIN] Login attempt")
-        print(f"📥 [DATA] Received: {data}")
-        print("="*60)
+        logger.debug("[LOGIN] Login attempt")
         
         # Validate required fields
         if not data:
-            print("❌ [ERROR] No data received")
+            logger.debug("[LOGIN] No data received")
             return jsonify({'error': 'No data provided'}), 400
         
         if 'email' not in data:
-            print("❌ [ERROR] Missing email field")
+            logger.debug("[LOGIN] Missing email field")
             return jsonify({'error': 'Email is required'}), 400
             
         if 'password' not in data:
-            print("❌ [ERROR] Missing password field")
+            logger.debug("[LOGIN] Missing password field")
             return jsonify({'error': 'Password is required'}), 400
         
         email = data.get('email')
         password = data.get('password')
         
-        print(f"📧 [EMAIL] {email}")
-        print(f"🔑 [PASSWORD] {'*' * len(password)} ({len(password)} chars)")
+        logger.debug("[LOGIN] email=%s", email)
+        
+        # ✅ Throttle per IP + email before doing any password hashing
+        if not login_rate_limiter.hit(
+            f"{request.remote_addr}:{str(email).lower()}",
+            current_app.config['LOGIN_RATE_LIMIT'],
+            current_app.config['LOGIN_RATE_WINDOW'],
+        ):
+            logger.warning("[LOGIN] Rate limit hit for %s from %s", email, request.remote_addr)
+            return jsonify({'error': 'Too many login attempts. Please try again later.'}), 429
         
-        # Find user
-        user = User.query.filter_by(email=email).first()
+        # Find user (profile flags + password hash only, never the biometric blobs)
+        user = User.query.options(
+            load_only(*PROFILE_COLUMNS, User.password_hash)
+        ).filter_by(email=email).first()
         
         if not user:
-            print(f"❌ [ERROR] User not found: {email}")
+            logger.debug("[LOGIN] User not found: %s", email)
+            check_password_hash(_DUMMY_PASSWORD_HASH, password)
             return jsonify({'error': 'Invalid email or password'}), 400
         
-        print(f"✅ [USER] Found: {user.username} (ID: {user.id})")
+        logger.debug("[LOGIN] Found user %s (ID: %s)", user.username, user.id)
         
         # Check password
         if not user.check_password(password):
-            print(f"❌ [ERROR] Invalid password for user: {user.username}")
+            logger.debug("[LOGIN] Invalid password for user: %s", user.username)
             return jsonify({'error': 'Invalid email or password'}), 400
         
-        print(f"✅ [PASSWORD] Correct")
-        
         # Check if MFA is required
-        mfa_methods = []
-        if user.face_enrolled:
-            mfa_methods.append('face')
-        if user.voice_enrolled:
-            mfa_methods.append('voice')
-        if user.gesture_enrolled:
-            mfa_methods.append('gesture')
-        if user.keystroke_enrolled:
-            mfa_methods.append('keystroke')
-        if user.otp_enrolled:  # ✅ FIXED: was totp_enabled
-            mfa_methods.append('totp')
-        
-        print(f"🔐 [MFA] Enrolled methods: {mfa_methods}")
+        mfa_methods = user.enrolled_methods()
+        
+        logger.debug("[MFA] Enrolled methods: %s", mfa_methods)
         
         if mfa_methods:
             # MFA required
             mfa_token = create_mfa_token(user.id)
-            print(f"✅ [MFA] Token generated: {mfa_token[:20]}...")
-            print("="*60 + "\n")
             
             return jsonify({
                 'requires_mfa': True,
@@ -216,19 +412,15 @@ def login():
             }), 200
         else:
             # No MFA, direct login
-            access_token = create_access_token(identity=user.id)
-            refresh_token = create_refresh_token(identity=user.id)
+            access_token, refresh_token = issue_token_pair(user.id)
             
             # Update last login
-            user.last_login = datetime.utcnow()
-            db.session.commit()
+            touch_last_login(user)
             
             # Log login attempt
             log_login_attempt(user.id, 'password', True, 100.0)
             
-            print(f"✅ [LOGIN] Direct login successful")
-            print(f"🎫 [TOKEN] Access token generated")
-            print("="*60 + "\n")
+            logger.debug("[LOGIN] Direct login successful for user %s", user.id)
             
             return jsonify({
                 'message': 'Login successful',
@@ -238,10 +430,7 @@ def login():
             }), 200
         
     except Exception as e:
-        print(f"❌ [EXCEPTION] {type(e).__name__}: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print("="*60 + "\n")
+        log_exception(logger, "[LOGIN] Login failed")
         return jsonify({'error': 'Login failed'}), 500
 
 
@@ -251,19 +440,15 @@ def login():
 # ===========================
 
 
-@auth_bp.route('/mfa/verify-face', methods=['POST', 'OPTIONS'])
+@auth_bp.route('/mfa/verify-face', methods=['POST'])
 def verify_face():
     """Verify face recognition with STRICT multi-metric validation"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         data = request.get_json()
         mfa_token = data.get('mfa_token')
         face_image = data.get('face_image')
         
-        print("\n" + "="*60)
-        print("🔐 [FACE VERIFY] Starting STRICT face verification")
+        logger.debug("[FACE VERIFY] Starting STRICT face verification")
         
         if not mfa_token:
             return jsonify({'error': 'MFA token is required'}), 400
@@ -272,67 +457,60 @@ def verify_face():
             return jsonify({'error': 'Face image is required'}), 400
         
         # Decode MFA token to get user_id
-        user_id = decode_mfa_token(mfa_token)
-        user = User.query.get(user_id)
+        user_id = mfa_user_id()
+        user = _load_user(user_id, User.face_encoding)
         
         # ✅ STRICT CHECK: Ensure user exists and face is enrolled
         if not user:
-            print("❌ [ERROR] User not found")
+            logger.debug("[FACE VERIFY] User not found")
             return jsonify({'error': 'User not found'}), 404
         
         if not user.face_enrolled or not user.face_encoding:
-            print("❌ [ERROR] Face not enrolled for this user")
+            logger.debug("[FACE VERIFY] Face not enrolled for user %s", user.id)
             return jsonify({'error': 'Face authentication not enrolled'}), 400
         
-        print(f"👤 [USER] {user.username} (ID: {user.id})")
-        
-        # Import face service
-        from services.face_recognition import face_service
-        
-        # ✅ Extract embedding from LOGIN attempt
-        print("🔍 [EXTRACT] Extracting embedding from login face...")
-        test_embedding, error, _ = face_service.extract_embedding(
-            face_image,
-            user_id=user.id,
-            username=user.username,
-            save_image=False  # Don't save login attempts
-        )
-        
-        if error:
-            print(f"❌ [ERROR] {error}")
-            return jsonify({'error': error}), 400
+        logger.debug("[USER] %s (ID: %s)", user.username, user.id)
         
-        # ✅ Load ENROLLED face embedding for THIS USER
-        print("📦 [LOAD] Loading enrolled face embedding...")
-        try:
-            stored_embedding = face_service.deserialize_embedding(user.face_encoding)
-        except Exception as e:
-            print(f"❌ [ERROR] Failed to load stored embedding: {str(e)}")
-            return jsonify({'error': 'Invalid stored face data. Please re-enroll.'}), 500
-        
-        # ✅ STRICT VERIFICATION: Compare embeddings
-        print("🔐 [VERIFY] Comparing faces with STRICT threshold...")
-        is_match, confidence, distance = face_service.verify_faces(
-            stored_embedding,
-            test_embedding
-        )
+        # ✅ A resubmitted frame that just matched skips re-extraction
+        replay = verify_cache.get('face', user.id, request.get_data())
+        if replay is not None:
+            is_match, confidence, distance = replay
+        else:
+            # ✅ Extract embedding from LOGIN attempt
+            test_embedding, error, _ = face_service.extract_embedding(
+                face_image,
+                user_id=user.id,
+                username=user.username,
+                save_image=False  # Don't save login attempts
+            )
+            
+            if error:
+                logger.debug("[VERIFY] %s", error)
+                return jsonify({'error': error}), 400
+            
+            # ✅ Load ENROLLED face embedding for THIS USER
+            try:
+                stored_embedding = embedding_cache.get(
+                    'face', user.id, user.face_encoding, face_service.deserialize_embedding
+                )
+            except Exception as e:
+                logger.error("[FACE VERIFY] Failed to load stored embedding: %s", e)
+                return jsonify({'error': 'Invalid stored face data. Please re-enroll.'}), 500
+            
+            # ✅ STRICT VERIFICATION: Compare embeddings
+            is_match, confidence, distance = face_service.verify_faces(
+                stored_embedding,
+                test_embedding
+            )
+            if is_match:
+                verify_cache.put('face', user.id, request.get_data(), (is_match, confidence, distance))
         
         # ✅ STRICT DECISION: Only allow if match is TRUE
         if not is_match:
-            print(f"❌ [FAILED] Face verification failed")
-            print(f"   Distance: {distance:.6f}")
-            print(f"   Confidence: {confidence:.2f}%")
+            logger.debug("[FACE VERIFY] Failed (distance: %.6f, confidence: %.2f%%)", distance, confidence)
             
             # Log failed attempt
-            login_record = LoginHistory(
-                user_id=user.id,
-                ip_address=request.remote_addr,
-                user_agent=request.headers.get('User-Agent'),
-                method_type='face',  # ✅ FIXED
-                success=False
-            )
-            db.session.add(login_record)
-            db.session.commit()
+            log_login_attempt(user.id, 'face', False)
             
             return jsonify({
                 'error': 'Face verification failed. The face does not match your enrolled face.',
@@ -341,26 +519,15 @@ def verify_face():
             }), 401
         
         # ✅ SUCCESS: Generate tokens
-        print(f"✅ [SUCCESS] Face verified (confidence: {confidence:.2f}%)")
+        logger.debug("[FACE VERIFY] Verified (confidence: %.2f%%)", confidence)
         
-        access_token = create_access_token(identity=user.id)
-        refresh_token = create_refresh_token(identity=user.id)
+        access_token, refresh_token = issue_token_pair(user.id)
         
-        user.last_login = datetime.utcnow()
+        touch_last_login(user)
         
         # Log successful login
-        login_record = LoginHistory(
-            user_id=user.id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            method_type='face',  # ✅ FIXED
-            success=True,
-            confidence=float(confidence)  # ✅ Added confidence
-        )
-        db.session.add(login_record)
-        db.session.commit()
+        log_login_attempt(user.id, 'face', True, float(confidence))
         
-        print("="*60 + "\n")
         
         return jsonify({
             'message': f'Face verified successfully (confidence: {confidence:.2f}%)',
@@ -372,19 +539,13 @@ def verify_face():
         }), 200
         
     except Exception as e:
-        print(f"❌ [ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print("="*60 + "\n")
+        log_exception(logger, "[FACE VERIFY] Verification failed")
         return jsonify({'error': 'Verification failed. Please try again.'}), 500
 
 
-@auth_bp.route('/mfa/verify-voice', methods=['POST', 'OPTIONS'])
+@auth_bp.route('/mfa/verify-voice', methods=['POST'])
 def mfa_verify_voice():
     """Verify voice as an MFA step"""
-    if request.method == 'OPTIONS':
-        return '', 200
-
     try:
         data = request.get_json() or {}
         mfa_token = data.get('mfa_token')
@@ -393,46 +554,49 @@ def mfa_verify_voice():
         if not mfa_token or not base64_audio:
             return jsonify({'error': 'MFA token and voice_audio are required'}), 400
 
+        voice_service_v2, SecurityProfile = get_voice()
+
         # Use same helper as other MFA routes
-        user_id = decode_mfa_token(mfa_token)
-        user = User.query.get(user_id)
+        user_id = mfa_user_id()
+        # Template rides along in the same SELECT (one-to-one, so a JOIN)
+        user = _load_user(user_id, options=[joinedload(User.voice_template)])
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        template = VoiceTemplate.query.filter_by(user_id=user.id).first()
+        template = user.voice_template
         if not template or not template.features:
             return jsonify({'error': 'Voice not enrolled'}), 400
 
-        known_features = voice_service_v2.deserialize_features(template.features)
-        known_meta = json.loads(template.meta_json or "{}")
-
-        probe_features, probe_meta, _ = voice_service_v2.extract_features(
-            base64_audio=base64_audio,
-            user_id=str(user.id),
-            username=user.username,
-            save_audio=False,
-            profile=SecurityProfile.BALANCED,
-        )
+        # A resubmitted clip that just matched skips feature extraction
+        result = verify_cache.get('voice', user.id, request.get_data())
+        if result is None:
+            known_features = embedding_cache.get(
+                'voice', user.id, template.features, voice_service_v2.deserialize_features
+            )
+            known_meta = template.meta_json or {}
+
+            probe_features, probe_meta, _ = voice_service_v2.extract_features(
+                base64_audio=base64_audio,
+                user_id=str(user.id),
+                username=user.username,
+                save_audio=False,
+                profile=SecurityProfile.BALANCED,
+            )
 
-        result = voice_service_v2.verify(
-            known_features=known_features,
-            probe_features=probe_features,
-            known_meta=known_meta,
-            probe_meta=probe_meta,
-            profile=SecurityProfile.BALANCED,
-        )
+            result = voice_service_v2.verify(
+                known_features=known_features,
+                probe_features=probe_features,
+                known_meta=known_meta,
+                probe_meta=probe_meta,
+                profile=SecurityProfile.BALANCED,
+            )
+            if result.is_match:
+                verify_cache.put('voice', user.id, request.get_data(), result)
 
-        record = LoginHistory(
-            user_id=user.id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            method_type='voice',
-            success=result.is_match,
-            confidence=result.similarity * 100.0,
-            failure_reason=None if result.is_match else 'Voice mismatch',
+        log_login_attempt(
+            user.id, 'voice', result.is_match, result.similarity * 100.0,
+            None if result.is_match else 'Voice mismatch',
         )
-        db.session.add(record)
-        db.session.commit()
 
         if not result.is_match:
             return jsonify({
@@ -441,8 +605,7 @@ def mfa_verify_voice():
                 'flags': result.flags,
             }), 401
 
-        access_token = create_access_token(identity=user.id)
-        refresh_token = create_refresh_token(identity=user.id)
+        access_token, refresh_token = issue_token_pair(user.id)
 
         return jsonify({
             'message': 'Voice verified successfully',
@@ -453,15 +616,12 @@ def mfa_verify_voice():
         }), 200
 
     except Exception as e:
-        print('mfa_verify_voice error:', e)
+        logger.error("[VOICE VERIFY] %s", e)
         return jsonify({'error': 'Internal server error'}), 500
     
-@auth_bp.route('/mfa/verify-otp', methods=['POST', 'OPTIONS'])
+@auth_bp.route('/mfa/verify-otp', methods=['POST'])
 def verify_otp():
     """Verify OTP/TOTP code"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         data = request.get_json()
         mfa_token = data.get('mfa_token')
@@ -472,40 +632,27 @@ def verify_otp():
         
         # 🔍 Decode MFA token with error handling
         try:
-            user_id = decode_mfa_token(mfa_token)
+            user_id = mfa_user_id()
             if not user_id:
                 return jsonify({'error': 'Invalid MFA token'}), 401
         except Exception as token_err:
-            print(f"MFA token decode failed: {token_err}")
+            logger.debug("[OTP VERIFY] MFA token decode failed: %s", token_err)
             return jsonify({'error': 'Invalid or expired MFA token'}), 401
         
-        user = User.query.get(user_id)
+        user = _load_user(user_id, User.otp_secret)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         if not user.otp_enrolled:
             return jsonify({'error': 'OTP not enrolled for this user'}), 400
         
-        # 🔧 Verify OTP with time window & detailed logging
-        import pyotp
-        totp = pyotp.TOTP(user.otp_secret)
+        # 🔧 Verify OTP; allow 90s window (3x30s) for clock drift
+        is_valid = verify_totp(user.otp_secret, otp_code)
         
-        # Allow 90s window (3x30s) for clock drift
-        is_valid = totp.verify(otp_code, valid_window=3)
-        
-        print(f"TOTP Debug - User: {user.id}, Secret: {user.otp_secret[:8]}..., Code: {otp_code}, Valid: {is_valid}")
+        logger.debug("[OTP VERIFY] User: %s, Valid: %s", user.id, is_valid)
         
         if not is_valid:
             # Log failed attempt
-            login_record = LoginHistory(
-                user_id=user.id,
-                ip_address=request.remote_addr,
-                user_agent=request.headers.get('User-Agent'),
-                method_type='totp',
-                success=False,
-                failure_reason=f'Invalid OTP code: {otp_code}'
-            )
-            db.session.add(login_record)
-            db.session.commit()
+            log_login_attempt(user.id, 'totp', False, failure_reason=f'Invalid OTP code: {otp_code}')
             
             return jsonify({
                 'error': 'Invalid OTP code',
@@ -514,21 +661,11 @@ def verify_otp():
             }), 401
         
         # ✅ Success - Create tokens & update user
-        access_token = create_access_token(identity=user.id)
-        refresh_token = create_refresh_token(identity=user.id)
-        
-        user.last_login = datetime.utcnow()
-        
-        login_record = LoginHistory(
-            user_id=user.id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            method_type='totp',
-            success=True,
-            confidence=100.0
-        )
-        db.session.add(login_record)
-        db.session.commit()
+        access_token, refresh_token = issue_token_pair(user.id)
+        
+        touch_last_login(user)
+        
+        log_login_attempt(user.id, 'totp', True, 100.0)
         
         return jsonify({
             'message': 'OTP verified successfully',
@@ -537,24 +674,18 @@ def verify_otp():
             'user': user.to_dict()
         }), 200
         
-    except pyotp.HOTPError as e:
-        print(f"TOTP HOTP Error: {e}")
-        return jsonify({'error': 'Invalid OTP secret format'}), 400
     except ValueError as e:
-        print(f"TOTP ValueError: {e}")
+        logger.warning("[OTP VERIFY] ValueError: %s", e)
         return jsonify({'error': 'Invalid OTP code format'}), 400
     except Exception as e:
-        print(f"Verify OTP unexpected error: {e}")
+        logger.error("[OTP VERIFY] Unexpected error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 
 
-@auth_bp.route('/mfa/verify-backup-code', methods=['POST', 'OPTIONS'])
+@auth_bp.route('/mfa/verify-backup-code', methods=['POST'])
 def verify_backup_code():
     """Verify backup code"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         data = request.get_json()
         mfa_token = data.get('mfa_token')
@@ -563,79 +694,68 @@ def verify_backup_code():
         if not mfa_token or not backup_code:
             return jsonify({'error': 'MFA token and backup code are required'}), 400
         
-        user_id = decode_mfa_token(mfa_token)
-        user = User.query.get(user_id)
+        user_id = mfa_user_id()
+        user = _load_user(user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        codes = BackupCode.query.filter_by(user_id=user.id, is_used=False).all()
+        backup_code = backup_code.strip().upper()
+        
+        # ✅ Codes are stored as HMACs, so hash once and look the row up directly
+        code = BackupCode.query.filter_by(
+            user_id=user.id, is_used=False, code_hash=BackupCode.hash_code(backup_code)
+        ).first()
+        
+        if code is None:
+            # Codes issued before the HMAC switch are salted and can't be looked up
+            legacy_codes = BackupCode.query.filter(
+                BackupCode.user_id == user.id,
+                BackupCode.is_used.is_(False),
+                BackupCode.code_hash.contains('$'),
+            ).all()
+            code = next((c for c in legacy_codes if c.check_code(backup_code)), None)
+        
+        # ✅ Mark it used with a conditional UPDATE so two concurrent requests
+        # can't both redeem the same code
+        if code is not None and _claim_backup_code(code.id):
+            access_token, refresh_token = issue_token_pair(user.id)
+            
+            db.session.commit()
+            touch_last_login(user)
+            log_login_attempt(user.id, 'backup', True, 100.0)
+            
+            return jsonify({
+                'message': 'Backup code verified successfully',
+                'access_token': access_token,
+                'refresh_token': refresh_token,
+                'user': user.to_dict()
+            }), 200
         
-        if not codes:
+        if code is None and not db.session.query(
+            BackupCode.query.filter_by(user_id=user.id, is_used=False).exists()
+        ).scalar():
             return jsonify({'error': 'No backup codes available'}), 400
         
-        for code in codes:
-            if code.check_code(backup_code.strip().upper()):
-                code.is_used = True
-                code.used_at = datetime.utcnow()
-                
-                access_token = create_access_token(identity=user.id)
-                refresh_token = create_refresh_token(identity=user.id)
-                
-                user.last_login = datetime.utcnow()
-                
-                login_record = LoginHistory(
-                    user_id=user.id,
-                    ip_address=request.remote_addr,
-                    user_agent=request.headers.get('User-Agent'),
-                    method_type='backup',  # ✅ FIXED
-                    success=True,
-                    confidence=100.0
-                )
-                db.session.add(login_record)
-                db.session.commit()
-                
-                return jsonify({
-                    'message': 'Backup code verified successfully',
-                    'access_token': access_token,
-                    'refresh_token': refresh_token,
-                    'user': user.to_dict()
-                }), 200
-        
         # Log failed attempt
-        login_record = LoginHistory(
-            user_id=user.id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            method_type='backup',  # ✅ FIXED
-            success=False,
-            failure_reason='Invalid backup code'
-        )
-        db.session.add(login_record)
-        db.session.commit()
+        log_login_attempt(user.id, 'backup', False, failure_reason='Invalid backup code')
         
         return jsonify({'error': 'Invalid backup code'}), 401
         
     except Exception as e:
-        print(f"❌ [BACKUP CODE ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log_exception(logger, "[BACKUP CODE] Verification failed")
         return jsonify({'error': str(e)}), 500
 
 
-@auth_bp.route('/mfa/verify-gesture', methods=['POST', 'OPTIONS'])
+@auth_bp.route('/mfa/verify-gesture', methods=['POST'])
 def verify_gesture():
     """Verify gesture recognition with STRICT matching"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         data = request.get_json()
         mfa_token = data.get('mfa_token')
         gesture_data = data.get('gesture')
         
-        print("\n" + "="*60)
-        print("✋ [GESTURE VERIFY] Starting gesture verification")
+        logger.debug("[GESTURE VERIFY] Starting gesture verification")
         
         if not mfa_token:
             return jsonify({'error': 'MFA token is required'}), 400
@@ -643,95 +763,66 @@ def verify_gesture():
         if not gesture_data:
             return jsonify({'error': 'Gesture data is required'}), 400
         
-        user_id = decode_mfa_token(mfa_token)
-        user = User.query.get(user_id)
+        user_id = mfa_user_id()
+        user = _load_user(user_id, User.gesture_features)
         
         if not user or not user.gesture_enrolled:
-            print("❌ [GESTURE VERIFY] Gesture not enrolled")
+            logger.debug("[GESTURE VERIFY] Gesture not enrolled")
             return jsonify({'error': 'Gesture authentication not enrolled'}), 400
         
-        print(f"👤 [USER] {user.username} (ID: {user.id})")
+        logger.debug("[USER] %s (ID: %s)", user.username, user.id)
         
-        # Import gesture service
-        try:
-            from services.gesture_recognition import gesture_service
-        except ImportError:
-            import importlib.util
-            import os
-            import sys
-            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            spec = importlib.util.spec_from_file_location(
-                "gesture_recognition_service",
-                os.path.join(backend_dir, "services", "gesture_recognition.py")
+        # A resubmitted gesture that just matched skips re-extraction
+        replay = verify_cache.get('gesture', user.id, request.get_data())
+        if replay is not None:
+            is_match, similarity, distance = replay
+        else:
+            # Extract features from provided gesture
+            test_features, error, _ = gesture_service.extract_features(
+                gesture_data,
+                user_id=user.id,
+                username=user.username,
+                save_pattern=False
             )
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            gesture_service = module.gesture_service
-        
-        # Extract features from provided gesture
-        print("🔍 [EXTRACT] Extracting features from login gesture...")
-        test_features, error, _ = gesture_service.extract_features(
-            gesture_data,
-            user_id=user.id,
-            username=user.username,
-            save_pattern=False
-        )
-        
-        if error:
-            print(f"❌ [ERROR] {error}")
-            return jsonify({'error': error}), 400
-        
-        # Load enrolled gesture features
-        print("📦 [LOAD] Loading enrolled gesture features...")
-        stored_features = gesture_service.deserialize_features(user.gesture_features)
-        
-        # Verify gestures match
-        print("🔐 [VERIFY] Comparing gestures with STRICT threshold...")
-        is_match, similarity, distance = gesture_service.verify_gestures(
-            stored_features,
-            test_features
-        )
+            
+            if error:
+                logger.debug("[VERIFY] %s", error)
+                return jsonify({'error': error}), 400
+            
+            # Load enrolled gesture features
+            stored_features = embedding_cache.get(
+                'gesture', user.id, user.gesture_features, gesture_service.deserialize_features
+            )
+            
+            # Verify gestures match
+            is_match, similarity, distance = gesture_service.verify_gestures(
+                stored_features,
+                test_features
+            )
+            if is_match:
+                verify_cache.put('gesture', user.id, request.get_data(), (is_match, similarity, distance))
         
         if not is_match:
-            print(f"❌ [FAILED] Gesture verification failed (similarity: {similarity:.2%})")
+            logger.debug("[GESTURE VERIFY] Failed (similarity: %.2f%%)", similarity * 100)
             
             # Log failed attempt
-            login_record = LoginHistory(
-                user_id=user.id,
-                ip_address=request.remote_addr,
-                user_agent=request.headers.get('User-Agent'),
-                method_type='gesture',  # ✅ FIXED
-                success=False
-            )
-            db.session.add(login_record)
-            db.session.commit()
+            log_login_attempt(user.id, 'gesture', False)
             
             return jsonify({
                 'error': 'Gesture verification failed. Please try again or use a different method.',
                 'similarity': similarity
             }), 401
         
-        print(f"✅ [SUCCESS] Gesture verified (similarity: {similarity:.2%})")
+        logger.debug("[GESTURE VERIFY] Verified (similarity: %.2f%%)", similarity * 100)
         
         # Generate tokens
-        access_token = create_access_token(identity=user.id)
-        refresh_token = create_refresh_token(identity=user.id)
+        access_token, refresh_token = issue_token_pair(user.id)
         
-        user.last_login = datetime.utcnow()
+        touch_last_login(user)
         
         # Log successful login
-        login_record = LoginHistory(
-            user_id=user.id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            method_type='gesture',  # ✅ FIXED
-            success=True,
-            confidence=float(similarity * 100)
-        )
-        db.session.add(login_record)
-        db.session.commit()
+        log_login_attempt(user.id, 'gesture', True, float(similarity * 100))
         
-        print("="*60 + "\n")
         
         return jsonify({
             'message': f'Gesture verified successfully (confidence: {similarity:.2%})',
@@ -742,20 +833,14 @@ def verify_gesture():
         }), 200
         
     except Exception as e:
-        print(f"❌ [ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print("="*60 + "\n")
+        log_exception(logger, "[GESTURE VERIFY] Verification failed")
         return jsonify({'error': str(e)}), 500
 
 
 
-@auth_bp.route('/mfa/verify-keystroke', methods=['POST', 'OPTIONS'])
+@auth_bp.route('/mfa/verify-keystroke', methods=['POST'])
 def verify_keystroke():
     """Verify keystroke dynamics with ML-based matching"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         data = request.get_json()
         mfa_token = data.get('mfa_token')
@@ -765,42 +850,39 @@ def verify_keystroke():
         if not mfa_token or not keystroke_sample:
             return jsonify({'error': 'MFA token and keystroke data required'}), 400
         
-        user_id = decode_mfa_token(mfa_token)
-        user = User.query.get(user_id)
+        user_id = mfa_user_id()
+        user = _load_user(user_id, User.keystroke_passphrase, User.keystroke_features,
+                          User.keystroke_enrolled_at)
         
         if not user or not user.keystroke_enrolled:
             return jsonify({'error': 'Keystroke pattern not enrolled'}), 400
         
-        # Verify passphrase
-        if passphrase != user.keystroke_passphrase:
+        # Verify passphrase (constant-time; bytes so non-ASCII input is allowed)
+        if not hmac.compare_digest(
+            (passphrase or '').encode(), (user.keystroke_passphrase or '').encode()
+        ):
+            log_login_attempt(user.id, 'keystroke', False, failure_reason='Incorrect passphrase')
             return jsonify({'error': 'Incorrect passphrase'}), 401
         
-        # Import keystroke service
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-        
-        from services.keystroke_service import verify_keystroke_pattern
-        import json
-        
         # Load enrolled profile
-        enrolled_profile = json.loads(user.keystroke_features)
-        
+        enrolled_profile = user.keystroke_features
+
+        # (mean, 1/std) rows are rebuilt only when the profile is re-enrolled
+        profile_matrix = None
+        if user.keystroke_enrolled_at is not None:
+            profile_matrix = embedding_cache.get(
+                'keystroke', user.id, enrolled_profile, keystroke_analyzer.profile_matrix,
+                version=user.keystroke_enrolled_at
+            )
+
         # Verify keystroke pattern
-        verified, confidence = verify_keystroke_pattern(enrolled_profile, keystroke_sample)
+        verified, confidence = verify_keystroke_pattern(
+            enrolled_profile, keystroke_sample, profile_matrix
+        )
         
         if not verified:
             # Log failed attempt
-            login_record = LoginHistory(
-                user_id=user.id,
-                ip_address=request.remote_addr,
-                user_agent=request.headers.get('User-Agent'),
-                method_type='keystroke',  # ✅ FIXED
-                success=False,
-                confidence=float(confidence)
-            )
-            db.session.add(login_record)
-            db.session.commit()
+            log_login_attempt(user.id, 'keystroke', False, float(confidence))
             
             return jsonify({
                 'error': 'Keystroke pattern does not match',
@@ -808,21 +890,11 @@ def verify_keystroke():
             }), 401
         
         # Generate tokens
-        access_token = create_access_token(identity=user.id)
-        refresh_token = create_refresh_token(identity=user.id)
-        
-        user.last_login = datetime.utcnow()
-        
-        login_record = LoginHistory(
-            user_id=user.id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent'),
-            method_type='keystroke',  # ✅ FIXED
-            success=True,
-            confidence=float(confidence)
-        )
-        db.session.add(login_record)
-        db.session.commit()
+        access_token, refresh_token = issue_token_pair(user.id)
+        
+        touch_last_login(user)
+        
+        log_login_attempt(user.id, 'keystroke', True, float(confidence))
         
         return jsonify({
             'message': f'Keystroke verified (confidence: {confidence:.2%})',
@@ -841,13 +913,10 @@ def verify_keystroke():
 # ===========================
 
 
-@auth_bp.route('/refresh', methods=['POST', 'OPTIONS'])
+@auth_bp.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
     """Refresh access token"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         current_user_id = get_jwt_identity()
         access_token = create_access_token(identity=current_user_id)
@@ -863,11 +932,28 @@ def refresh():
 # ===========================
 
 
-@auth_bp.route('/logout', methods=['POST', 'OPTIONS'])
+@auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    """Logout user"""
-    if request.method == 'OPTIONS':
-        return '', 200
+    """Logout user: revoke the access token and, if sent, the refresh token"""
+    claims = get_jwt()
+    revoked = [(claims['jti'], claims['exp'])]
+    
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            refresh_claims = decode_token(refresh_token)
+        except Exception:
+            return jsonify({'error': 'Invalid refresh token'}), 400
+        if refresh_claims.get('type') != 'refresh' or refresh_claims['sub'] != claims['sub']:
+            return jsonify({'error': 'Invalid refresh token'}), 400
+        revoked.append((refresh_claims['jti'], refresh_claims['exp']))
     
-    return jsonify({'message': 'Logged out successfully'}), 200
+    try:
+        current_blocklist().revoke(revoked)
+        return jsonify({'message': 'Logged out successfully'}), 200
+
+    except Exception:
+        db.session.rollback()
+        log_exception(logger, "[LOGOUT] Logout failed")
+        return jsonify({'error': 'Logout failed'}), 500
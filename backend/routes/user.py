@@ -5,36 +5,46 @@ backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 # ✅ Import db from extensions, not models
 from extensions import db
-from models import User, BackupCode, LoginHistory , VoiceTemplate
+from models import User, BackupCode, LoginHistory , VoiceTemplate, PROFILE_COLUMNS
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from sqlalchemy import and_, case, delete, func, or_, select, update
+from sqlalchemy.orm import load_only, raiseload
 import pyotp
-import qrcode
-from io import BytesIO
-import base64
-import json
-from services.voice_recognition import (
-    voice_service_v2,           # main singleton
-    SecurityProfile,
-)
+import logging
+
+from services import get_voice
+from services.embedding_cache import embedding_cache
+from services.face_recognition import face_service
+from services.gesture_recognition import gesture_service
+from services.keystroke_service import analyze_and_enroll_keystroke_pattern
+from services.otp_service import otp_service
+from services.verify_cache import verify_cache
+from utils.log_sampling import log_exception
 
 user_bp = Blueprint('user', __name__)
+logger = logging.getLogger(__name__)
+
+
+def _enroll_payload(user, method, message, **extra):
+    """Enroll response body; `?include_user=0` skips the user.to_dict() copy"""
+    payload = {'message': message, 'method': method, 'enrolled': True, **extra}
+    if request.args.get('include_user', '1') != '0':
+        payload['user'] = user.to_dict()
+    return payload
 
 
 # ===========================
 # USER PROFILE
 # ===========================
 
-@user_bp.route('/profile', methods=['GET', 'OPTIONS'])
+@user_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     """Get user profile"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -47,13 +57,10 @@ def get_profile():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@user_bp.route('/profile', methods=['PUT', 'OPTIONS'])
+@user_bp.route('/profile', methods=['PUT'])
 @jwt_required()
 def update_profile():
     """Update user profile"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -71,7 +78,6 @@ def update_profile():
                 return jsonify({'error': 'Email already in use'}), 400
             user.email = data['email']
         
-        user.updated_at = datetime.utcnow()
         db.session.commit()
         
         return jsonify({
@@ -87,60 +93,35 @@ def update_profile():
 # FACE RECOGNITION
 # ===========================
 
-@user_bp.route('/enroll/face', methods=['POST', 'OPTIONS'])
+@user_bp.route('/enroll/face', methods=['POST'])
 @jwt_required()
 def enroll_face():
     """Enroll user's face for biometric authentication with validation"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
-        print("\n" + "="*60)
-        print("📸 [FACE ENROLL] Starting face enrollment")
-        
         # Get current user from JWT
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
         
         if not user:
-            print("❌ [ERROR] User not found")
             return jsonify({'error': 'User not found'}), 404
         
-        print(f"👤 [USER] {user.username} (ID: {user.id})")
-        
         # Get face image from request
         face_image = None
         
         if request.is_json:
-            data = request.get_json()
+            # ✅ Parsed once by the orjson provider; the raw body is not kept around
+            data = request.get_json(cache=False)
             face_image = data.get('face_image')
-            print("📦 [FORMAT] JSON request")
         else:
             face_image = request.form.get('face_image')
-            print("📦 [FORMAT] FormData request")
         
         if not face_image:
-            print("❌ [ERROR] No face image provided")
             return jsonify({'error': 'Face image is required'}), 400
         
-        print(f"📏 [SIZE] Image data: {len(face_image)} characters")
-        
-        # Import face service
-        try:
-            from services.face_recognition import face_service
-        except ImportError:
-            # Fallback import
-            import importlib.util
-            spec = importlib.util.spec_from_file_location(
-                "face_recognition_service",
-                os.path.join(backend_dir, "services", "face_recognition.py")
-            )
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            face_service = module.face_service
+        logger.debug("[FACE ENROLL] %s (ID: %s), %d chars of image data",
+                     user.username, user.id, len(face_image))
         
         # ✅ EXTRACT: Get face embedding from enrollment image
-        print("🔍 [EXTRACT] Extracting face embedding for enrollment...")
         embedding, error, saved_path = face_service.extract_embedding(
             face_image,
             user_id=user.id,
@@ -149,79 +130,65 @@ def enroll_face():
         )
         
         if error:
-            print(f"❌ [ERROR] {error}")
+            logger.debug("[FACE ENROLL] %s", error)
             return jsonify({'error': error}), 400
         
         if embedding is None:
-            print("❌ [ERROR] No embedding extracted")
             return jsonify({'error': 'Could not extract face from image'}), 400
         
         # ✅ VALIDATE: Ensure embedding is valid
         if embedding.shape[0] != 128:
-            print(f"❌ [ERROR] Invalid embedding shape: {embedding.shape}")
+            logger.error("[FACE ENROLL] Invalid embedding shape: %s", embedding.shape)
             return jsonify({'error': 'Invalid face embedding extracted'}), 500
         
-        # ✅ SERIALIZE: Convert numpy array to JSON string for database
-        print("💾 [SERIALIZE] Converting embedding to database format...")
+        # ✅ SERIALIZE: Convert numpy array to float32 bytes for database
         try:
             serialized_embedding = face_service.serialize_embedding(embedding)
         except Exception as e:
-            print(f"❌ [ERROR] Serialization failed: {str(e)}")
+            logger.error("[FACE ENROLL] Serialization failed: %s", e)
             return jsonify({'error': 'Failed to process face data'}), 500
         
         # ✅ SAVE: Store in database
-        print("💾 [SAVE] Saving to database...")
         user.face_encoding = serialized_embedding
         user.face_enrolled = True
         user.face_enrolled_at = datetime.utcnow()
         
         db.session.commit()
+        embedding_cache.invalidate(user.id)
+        verify_cache.invalidate(user.id)
         
-        print("✅ [SUCCESS] Face enrolled successfully")
-        print(f"📊 [STATS] Embedding shape: {embedding.shape}")
-        print(f"📁 [SAVED] Image: {saved_path}")
-        print("="*60 + "\n")
+        logger.info("[FACE ENROLL] User %s enrolled (image: %s)", user.id, saved_path)
         
-        return jsonify({
-            'message': 'Face enrolled successfully',
-            'user': user.to_dict()
-        }), 200
+        return jsonify(_enroll_payload(user, 'face', 'Face enrolled successfully')), 200
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print("="*60 + "\n")
+        log_exception(logger, "[FACE ENROLL] Enrollment failed")
         return jsonify({'error': str(e)}), 500
 
 # ===========================
 # VOICE RECOGNITION
 # ===========================
 
-@user_bp.route("/enroll/voice", methods=["POST", "OPTIONS"])
+@user_bp.route("/enroll/voice", methods=["POST"])
 @jwt_required()
 def enroll_voice():
     """Enroll a user's voice. Expects JSON: { "voice_audio": "<base64 webm>" }"""
-    if request.method == "OPTIONS":
-        return "", 200
-
     try:
         current_user_id = get_jwt_identity()
         user: User = User.query.get(current_user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        data = request.get_json() or {}
+        data = request.get_json(cache=False) or {}
         base64_audio = data.get("voice_audio")
         if not base64_audio:
             return jsonify({"error": "Missing 'voice_audio' field"}), 400
 
-        print("\n" + "=" * 60)
-        print("🎤 [VOICE ENROLL] Starting voice enrollment")
-        print(f"👤 [USER] {user.username} (ID: {user.id})")
-        print("📦 [FORMAT] JSON request")
-        print(f"📏 [SIZE] Audio size: {len(base64_audio)} characters")
+        voice_service_v2, SecurityProfile = get_voice()
+
+        logger.debug("[VOICE ENROLL] %s (ID: %s), %d chars of audio data",
+                     user.username, user.id, len(base64_audio))
 
         # Extract features & optionally save raw audio
         feats, meta, saved_path = voice_service_v2.extract_features(
@@ -233,57 +200,44 @@ def enroll_voice():
         )
 
         # Serialize features for DB
-        features_str = voice_service_v2.serialize_features(feats)
+        features_blob = voice_service_v2.serialize_features(feats)
 
-        # Upsert voice template row
-        template = VoiceTemplate.query.filter_by(user_id=user.id).first()
-        if template is None:
-            template = VoiceTemplate(user_id=user.id)
-
-        template.features = features_str
-        template.meta_json = json.dumps(meta)
-        template.audio_path = saved_path
-        db.session.add(template)
+        # ✅ Upsert voice template row (INSERT ... ON CONFLICT (user_id) DO UPDATE)
+        VoiceTemplate.upsert(user.id, features_blob, meta, saved_path)
 
         # ✅ ALSO update flags on User so UI and login can see it
         user.voice_enrolled = True
-        user.voice_embedding = features_str  # keep in User for backward compatibility
-        user.updated_at = datetime.utcnow()
+        user.voice_embedding = None  # features live only in VoiceTemplate; drop any legacy copy
 
         db.session.commit()
+        embedding_cache.invalidate(user.id)
+        verify_cache.invalidate(user.id)
 
-        print("✅ [VOICE ENROLL] Voice enrolled successfully")
-        print(f"📊 [QUALITY] {meta.get('quality_score')}, duration={meta.get('duration_sec')}s")
-        print("=" * 60 + "\n")
+        logger.info("[VOICE ENROLL] User %s enrolled (quality %s, %ss)",
+                    user.id, meta.get('quality_score'), meta.get('duration_sec'))
 
-        return jsonify(
-            {
-                "message": "Voice enrolled successfully",
-                "quality_score": meta.get("quality_score"),
-                "duration_sec": meta.get("duration_sec"),
-                "user": user.to_dict(),
-            }
-        ), 200
+        return jsonify(_enroll_payload(
+            user, "voice", "Voice enrolled successfully",
+            quality_score=meta.get("quality_score"),
+            duration_sec=meta.get("duration_sec"),
+        )), 200
 
     except ValueError as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         db.session.rollback()
-        print("Voice enroll error:", e)
+        log_exception(logger, "[VOICE ENROLL] Enrollment failed")
         return jsonify({"error": "Internal server error"}), 500
 
 # ===========================
 # OTP/TOTP
 # ===========================
 
-@user_bp.route('/enroll/otp', methods=['POST', 'OPTIONS'])
+@user_bp.route('/enroll/otp', methods=['POST'])
 @jwt_required()
 def enroll_otp():
     """Enroll OTP/TOTP"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -298,25 +252,15 @@ def enroll_otp():
             issuer_name='MFA Auth System'
         )
         
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(provisioning_uri)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
+        qr_code = otp_service.build_qr_data_url(provisioning_uri, border=5)
         
         user.otp_secret = secret
         user.otp_enrolled = True
         db.session.commit()
         
-        return jsonify({
-            'message': 'OTP enrolled successfully',
-            'secret': secret,
-            'qr_code': f'data:image/png;base64,{qr_code_base64}',
-            'user': user.to_dict()
-        }), 200
+        return jsonify(_enroll_payload(
+            user, 'totp', 'OTP enrolled successfully', secret=secret, qr_code=qr_code
+        )), 200
         
     except Exception as e:
         db.session.rollback()
@@ -328,7 +272,10 @@ def generate_otp_qr():
     """Generate TOTP secret and QR code for the logged-in user."""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        # ✅ Only the columns the provisioning URI needs
+        user = db.session.get(User, user_id, options=[
+            load_only(User.id, User.username, User.email, User.otp_secret)
+        ])
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -346,17 +293,8 @@ def generate_otp_qr():
             issuer_name="MFA Authentication System"
         )
 
-        # Generate QR as PNG in memory
-        qr = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr.add_data(uri)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        img_bytes = buffer.getvalue()
-        img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-        data_url = f"data:image/png;base64,{img_b64}"
+        # Generate QR as an SVG data URL
+        data_url = otp_service.build_qr_data_url(uri)
 
         return jsonify({
             "qr_code": data_url,
@@ -364,63 +302,38 @@ def generate_otp_qr():
         }), 200
 
     except Exception as e:
-        print("Error generating OTP QR:", e)
+        log_exception(logger, "[OTP] Generating QR code failed")
         return jsonify({"error": "Failed to generate QR code"}), 500
 
 # ===========================
 # GESTURE RECOGNITION
 # ===========================
-@user_bp.route('/enroll/gesture', methods=['POST', 'OPTIONS'])
+@user_bp.route('/enroll/gesture', methods=['POST'])
 @jwt_required()
 def enroll_gesture():
     """Enroll gesture pattern with STRICT/BALANCED verification."""
-    if request.method == 'OPTIONS':
-        return '', 200
-
     try:
-        print("\n" + "=" * 60)
-        print("✋ [GESTURE ENROLL] Starting gesture enrollment")
-
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        print(f"👤 [USER] {user.username} (ID: {user.id})")
-
         if not request.is_json:
-            print("❌ [ERROR] Request content type is not JSON")
             return jsonify({'error': 'Request must be JSON'}), 400
 
-        data = request.get_json(silent=True) or {}
-        print(f"🧾 [RAW DATA] {data}")
+        data = request.get_json(silent=True, cache=False) or {}
 
         # Frontend now sends { "points": [...] }
         points = data.get('points')
         if not points or not isinstance(points, list):
-            print("❌ [ERROR] Gesture points are missing or invalid")
             return jsonify({'error': 'Gesture points are required'}), 400
 
         gesture_data = {'points': points}
 
-        total_points = len(points)
-        print(f"📊 [POINTS] {total_points} points in gesture")
-
-        # Import gesture service
-        try:
-            from services.gesture_recognition import gesture_service
-        except ImportError:
-            import importlib.util
-            spec = importlib.util.spec_from_file_location(
-                "gesture_recognition_service",
-                os.path.join(backend_dir, "services", "gesture_recognition.py"),
-            )
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            gesture_service = module.gesture_service
+        logger.debug("[GESTURE ENROLL] %s (ID: %s), %d points",
+                     user.username, user.id, len(points))
 
         # Extract features
-        print("🔍 [EXTRACT] Extracting gesture features...")
         features, error, saved_path = gesture_service.extract_features(
             gesture_data,
             user_id=user.id,
@@ -429,31 +342,25 @@ def enroll_gesture():
         )
 
         if error:
-            print(f"❌ [ERROR] {error}")
+            logger.debug("[GESTURE ENROLL] %s", error)
             return jsonify({'error': error}), 400
 
         # Serialize and store
-        print("💾 [SAVE] Saving features to database...")
         user.gesture_features = gesture_service.serialize_features(features)
         user.gesture_enrolled = True
         user.gesture_enrolled_at = datetime.utcnow()
 
         db.session.commit()
+        embedding_cache.invalidate(user.id)
+        verify_cache.invalidate(user.id)
 
-        print("✅ [SUCCESS] Gesture enrolled successfully")
-        print("=" * 60 + "\n")
+        logger.info("[GESTURE ENROLL] User %s enrolled", user.id)
 
-        return jsonify({
-            'message': 'Gesture enrolled successfully',
-            'user': user.to_dict(),
-        }), 200
+        return jsonify(_enroll_payload(user, 'gesture', 'Gesture enrolled successfully')), 200
 
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print("=" * 60 + "\n")
+        log_exception(logger, "[GESTURE ENROLL] Enrollment failed")
         return jsonify({'error': 'Internal server error'}), 500
 
 
@@ -462,13 +369,10 @@ def enroll_gesture():
 # KEYSTROKE DYNAMICS
 # ===========================
 
-@user_bp.route('/enroll/keystroke', methods=['POST', 'OPTIONS'])
+@user_bp.route('/enroll/keystroke', methods=['POST'])
 @jwt_required()
 def enroll_keystroke():
     """Enroll keystroke pattern"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -486,43 +390,32 @@ def enroll_keystroke():
         if len(keystroke_samples) < 3:
             return jsonify({'error': f'At least 3 samples required'}), 400
         
-        try:
-            from services.keystroke_service import enroll_keystroke_pattern, analyze_pattern_strength
-        except ImportError:
-            import importlib.util
-            spec = importlib.util.spec_from_file_location(
-                "keystroke_service",
-                os.path.join(backend_dir, "services", "keystroke_service.py")
-            )
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            enroll_keystroke_pattern = module.enroll_keystroke_pattern
-            analyze_pattern_strength = module.analyze_pattern_strength
-        
-        strength_analysis = analyze_pattern_strength(keystroke_samples)
+        # ✅ One feature-extraction pass feeds both the strength check and the profile
+        strength_analysis, profile = analyze_and_enroll_keystroke_pattern(
+            keystroke_samples, min_score=0.3
+        )
         
-        if strength_analysis['score'] < 0.3:
+        if profile is None:
             return jsonify({
                 'error': 'Keystroke pattern too weak',
                 'analysis': strength_analysis
             }), 400
         
-        profile = enroll_keystroke_pattern(keystroke_samples)
         profile['passphrase'] = passphrase
         profile['strength_analysis'] = strength_analysis
         
-        import json
-        user.keystroke_features = json.dumps(profile)
+        user.keystroke_features = profile
         user.keystroke_passphrase = passphrase
         user.keystroke_enrolled = True
         user.keystroke_enrolled_at = datetime.utcnow()
         db.session.commit()
+        embedding_cache.invalidate(user.id)
+        verify_cache.invalidate(user.id)
         
-        return jsonify({
-            'message': 'Keystroke pattern enrolled successfully',
-            'user': user.to_dict(),
-            'analysis': strength_analysis
-        }), 200
+        return jsonify(_enroll_payload(
+            user, 'keystroke', 'Keystroke pattern enrolled successfully',
+            analysis=strength_analysis,
+        )), 200
         
     except Exception as e:
         db.session.rollback()
@@ -532,17 +425,18 @@ def enroll_keystroke():
 # BACKUP CODES
 # ===========================
 
-@user_bp.route('/backup-codes', methods=['GET', 'OPTIONS'])
+@user_bp.route('/backup-codes', methods=['GET'])
 @jwt_required()
 def get_backup_codes():
     """Get backup codes status"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         user_id = get_jwt_identity()
-        total = BackupCode.query.filter_by(user_id=user_id).count()
-        used = BackupCode.query.filter_by(user_id=user_id, is_used=True).count()
+        # Total and used in one aggregate pass over the user's codes
+        total, used = db.session.query(
+            func.count(BackupCode.id),
+            func.coalesce(func.sum(case((BackupCode.is_used.is_(True), 1), else_=0)), 0),
+        ).filter(BackupCode.user_id == user_id).one()
+        used = int(used)
         
         return jsonify({
             'total': total,
@@ -553,30 +447,22 @@ def get_backup_codes():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@user_bp.route('/backup-codes/regenerate', methods=['POST', 'OPTIONS'])
+@user_bp.route('/backup-codes/regenerate', methods=['POST'])
 @jwt_required()
 def regenerate_backup_codes():
     """Regenerate backup codes"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        # ✅ Existence check + id only; codes are written with a bulk INSERT
+        user = db.session.get(User, user_id, options=[load_only(User.id)])
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        BackupCode.query.filter_by(user_id=user.id).delete()
+        BackupCode.query.filter_by(user_id=user.id).delete(synchronize_session=False)
         
-        plain_codes = []
-        for _ in range(10):
-            code = BackupCode.generate_code()
-            plain_codes.append(code)
-            
-            backup_code = BackupCode(user_id=user.id)
-            backup_code.set_code(code)
-            db.session.add(backup_code)
+        # One executemany INSERT for the whole set
+        plain_codes = user.generate_backup_codes(current_app.config['BACKUP_CODES_COUNT'])
         
         db.session.commit()
         
@@ -593,38 +479,62 @@ def regenerate_backup_codes():
 # LOGIN HISTORY
 # ===========================
 
-@user_bp.route('/login-history', methods=['GET', 'OPTIONS'])
+# Same keys as LoginHistory.to_dict()
+_HISTORY_COLUMNS = (
+    LoginHistory.id, LoginHistory.user_id, LoginHistory.login_time,
+    LoginHistory.ip_address, LoginHistory.user_agent, LoginHistory.success,
+    LoginHistory.method_type, LoginHistory.confidence, LoginHistory.failure_reason,
+)
+
+
+@user_bp.route('/login-history', methods=['GET'])
 @jwt_required()
 def get_login_history():
     """Get user's login history"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         user_id = get_jwt_identity()
         limit = request.args.get('limit', 50, type=int)
-        
-        print(f"📊 [LOGIN HISTORY] Fetching history for user_id: {user_id}, limit: {limit}")
-        
-        # Get login history from database
-        history = LoginHistory.query.filter_by(user_id=user_id)\
-            .order_by(LoginHistory.login_time.desc())\
-            .limit(limit)\
-            .all()
-        
-        history_list = [record.to_dict() for record in history]
-        
-        print(f"✅ [LOGIN HISTORY] Found {len(history_list)} records")
+        # Keyset cursor: (login_time, id) of the last row seen; id breaks timestamp ties
+        before = request.args.get('before')
+        before_id = request.args.get('before_id', type=int)
+        
+        # ✅ Read-only list: select the columns as plain rows, no ORM instances
+        # (SQLite index entries end in the rowid, so ix_loginhistory_user_time serves both keys)
+        query = (
+            select(*_HISTORY_COLUMNS)
+            .where(LoginHistory.user_id == user_id)
+            .order_by(LoginHistory.login_time.desc(), LoginHistory.id.desc())
+            .limit(limit)
+        )
+        if before:
+            try:
+                before_time = datetime.fromisoformat(before)
+            except ValueError:
+                return jsonify({'error': 'Invalid before cursor', 'history': []}), 400
+            if before_id is None:
+                query = query.where(LoginHistory.login_time < before_time)
+            else:
+                query = query.where(or_(
+                    LoginHistory.login_time < before_time,
+                    and_(LoginHistory.login_time == before_time, LoginHistory.id < before_id),
+                ))
+        
+        history_list = [dict(row) for row in db.session.execute(query).mappings()]
+        
+        next_before = None
+        if len(history_list) == limit:
+            # Pass back as ?before=&before_id= for the next page; walks the index, no OFFSET
+            last = history_list[-1]
+            next_before = {'before': last['login_time'], 'before_id': last['id']}
         
         return jsonify({
             'history': history_list,
-            'total': len(history_list)
+            'total': len(history_list),
+            'next_before': next_before,
         }), 200
         
     except Exception as e:
-        print(f"❌ [LOGIN HISTORY] Error: {str(e)}") 
-        import traceback
-        traceback.print_exc()
+        log_exception(logger, "[LOGIN HISTORY] Failed to load history")
         return jsonify({'error': str(e), 'history': []}), 500
 
 
@@ -632,62 +542,64 @@ def get_login_history():
 # UNENROLL
 # ===========================
 
-@user_bp.route('/unenroll/<method>', methods=['DELETE', 'OPTIONS'])
+# Columns cleared alongside each method's enrolled flag
+_UNENROLL_CLEARS = {
+    'face': ('face_encoding', 'face_image_path', 'face_enrolled_at'),
+    'voice': ('voice_embedding',),
+    'gesture': ('gesture_features', 'gesture_enrolled_at'),
+    'keystroke': ('keystroke_features', 'keystroke_passphrase', 'keystroke_enrolled_at'),
+    'totp': ('otp_secret',),
+}
+
+
+@user_bp.route('/unenroll/<method>', methods=['DELETE'])
 @jwt_required()
 def unenroll_method(method):
     """Remove an enrolled authentication method"""
-    if request.method == 'OPTIONS':
-        return '', 200
-    
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
         
         # Map method names to database fields
-        method_mapping = {
-            'face': 'face_enrolled',
-            'voice': 'voice_enrolled',
-            'gesture': 'gesture_enrolled',
-            'keystroke': 'keystroke_enrolled',
-            'totp': 'otp_enrolled'
-        }
+        method_mapping = dict(User.MFA_METHODS)
         
         if method not in method_mapping:
             return jsonify({'error': 'Invalid method'}), 400
         
         field_name = method_mapping[method]
         
-        # Check if method is enrolled
-        if not getattr(user, field_name, False):
+        # ✅ Flip the flag and clear the related data in one UPDATE; the
+        # enrolled-check is part of the WHERE clause
+        values = {field_name: False}
+        values.update(dict.fromkeys(_UNENROLL_CLEARS[method]))
+        result = db.session.execute(
+            update(User)
+            .where(User.id == user_id, getattr(User, field_name).is_(True))
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        
+        if result.rowcount == 0:
+            exists = db.session.execute(select(User.id).where(User.id == user_id)).first()
+            if exists is None:
+                return jsonify({'error': 'User not found'}), 404
             return jsonify({'error': 'Method not enrolled'}), 400
         
-        # Unenroll the method
-        setattr(user, field_name, False)
-        
-        # Also clear the related data
-        if method == 'face':
-            user.face_encoding = None
-            user.face_image_path = None
-            user.face_enrolled_at = None
-        elif method == 'voice':
-            user.voice_embedding = None
-            VoiceTemplate.query.filter_by(user_id=user.id).delete()
-        elif method == 'gesture':
-            user.gesture_features = None
-            user.gesture_enrolled_at = None
-        elif method == 'keystroke':
-            user.keystroke_features = None
-            user.keystroke_passphrase = None
-            user.keystroke_enrolled_at = None
-        elif method == 'totp':
-            user.otp_secret = None
+        if method == 'voice':
+            db.session.execute(
+                delete(VoiceTemplate).where(VoiceTemplate.user_id == user_id),
+                execution_options={'synchronize_session': False},
+            )
         
         db.session.commit()
         
-        print(f"✅ [UNENROLL] User {user.username} unenrolled from {method}")
+        # Profile for the response: to_dict() columns only, no lazy loads
+        user = db.session.get(User, user_id, options=[
+            load_only(*PROFILE_COLUMNS), raiseload('*')
+        ])
+        embedding_cache.invalidate(user.id)
+        verify_cache.invalidate(user.id)
+        
+        logger.info("[UNENROLL] User %s unenrolled from %s", user.id, method)
         
         return jsonify({
             'message': f'{method.capitalize()} authentication removed successfully',
@@ -696,5 +608,5 @@ def unenroll_method(method):
         
     except Exception as e:
         db.session.rollback()
-        print(f"❌ [UNENROLL] Error: {str(e)}")
+        log_exception(logger, "[UNENROLL] Failed to remove %s", method)
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
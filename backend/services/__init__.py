@@ -1 +1,12 @@
 # This makes services a Python package
+
+_voice = None
+
+
+def get_voice():
+    """(voice_service_v2, SecurityProfile), imported on first use; it pulls in numpy and pydub."""
+    global _voice
+    if _voice is None:
+        from services.voice_recognition import voice_service_v2, SecurityProfile
+        _voice = (voice_service_v2, SecurityProfile)
+    return _voice
@@ -1,20 +1,26 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from flask import current_app
-from models import DeviceFingerprint, db
+from models import DeviceFingerprint, db, upsert_insert
+from sqlalchemy import or_, select
 from utils.security import hash_fingerprint
 import user_agents
 
 
+@lru_cache(maxsize=4096)
+def _parse_user_agent(user_agent_string):
+    """user_agents.parse is a regex sweep; a client's UA string rarely changes"""
+    return user_agents.parse(user_agent_string or '')
+
+
 class DeviceFingerprintService:
     """Service for device fingerprint operations"""
     
-    def __init__(self):
-        self.trust_duration = None
-    
-    def _load_config(self):
-        """Load configuration from app context"""
-        if current_app:
-            self.trust_duration = current_app.config.get('DEVICE_TRUST_DURATION', 2592000)
+    def init_app(self, app):
+        """Resolve per-app settings once, at factory time"""
+        app.extensions['device_fingerprint'] = {
+            'trust_duration': timedelta(seconds=app.config.get('DEVICE_TRUST_DURATION', 2592000)),
+        }
     
     def create_or_update_device(self, user_id, fingerprint_data, ip_address, user_agent_string):
         """
@@ -29,13 +35,35 @@ class DeviceFingerprintService:
         Returns:
             DeviceFingerprint: Device object
         """
-        self._load_config()
-        
         # Hash the fingerprint
         fingerprint_hash = hash_fingerprint(fingerprint_data)
         
         # Parse user agent
-        user_agent = user_agents.parse(user_agent_string)
+        user_agent = _parse_user_agent(user_agent_string)
+        
+        now = datetime.utcnow()
+        insert = upsert_insert()
+        if insert is not None:
+            # Insert or refresh in one statement, keyed on (user_id, fingerprint_hash)
+            stmt = insert(DeviceFingerprint).values(
+                user_id=user_id,
+                fingerprint_hash=fingerprint_hash,
+                device_name=self._generate_device_name(user_agent),
+                device_type=self._get_device_type(user_agent),
+                browser=user_agent.browser.family,
+                os=user_agent.os.family,
+                ip_address=ip_address,
+                last_seen=now,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DeviceFingerprint.user_id, DeviceFingerprint.fingerprint_hash],
+                set_={'last_seen': now, 'ip_address': ip_address},
+            ).returning(DeviceFingerprint)
+            device = db.session.scalars(
+                stmt, execution_options={'populate_existing': True}
+            ).one()
+            db.session.commit()
+            return device
         
         # Check if device exists
         device = DeviceFingerprint.query.filter_by(
@@ -45,7 +73,7 @@ class DeviceFingerprintService:
         
         if device:
             # Update existing device
-            device.last_seen = datetime.utcnow()
+            device.last_seen = now
             device.ip_address = ip_address
         else:
             # Create new device
@@ -77,16 +105,23 @@ class DeviceFingerprintService:
         """
         fingerprint_hash = hash_fingerprint(fingerprint_data)
         
-        device = DeviceFingerprint.query.filter_by(
-            user_id=user_id,
-            fingerprint_hash=fingerprint_hash,
-            is_trusted=True
+        # Expiry is evaluated in SQL as a selected column rather than a WHERE
+        # term, so an expired device is still returned; NULL expiry means trusted
+        trust_valid = or_(
+            DeviceFingerprint.trust_expires_at.is_(None),
+            DeviceFingerprint.trust_expires_at > datetime.utcnow(),
+        )
+        row = db.session.execute(
+            select(DeviceFingerprint, trust_valid.label('trust_valid')).where(
+                DeviceFingerprint.user_id == user_id,
+                DeviceFingerprint.fingerprint_hash == fingerprint_hash,
+                DeviceFingerprint.is_trusted.is_(True),
+            )
         ).first()
         
-        if device and device.is_trust_valid():
-            return True, device
-        
-        return False, device
+        if row is None:
+            return False, None
+        return bool(row.trust_valid), row.DeviceFingerprint
     
     def trust_device(self, device_id, user_id):
         """
@@ -99,8 +134,6 @@ class DeviceFingerprintService:
         Returns:
             tuple: (success, error_message)
         """
-        self._load_config()
-        
         device = DeviceFingerprint.query.filter_by(
             id=device_id,
             user_id=user_id
@@ -110,7 +143,8 @@ class DeviceFingerprintService:
             return False, "Device not found"
         
         device.is_trusted = True
-        device.trust_expires_at = datetime.utcnow() + timedelta(seconds=self.trust_duration)
+        trust_duration = current_app.extensions['device_fingerprint']['trust_duration']
+        device.trust_expires_at = datetime.utcnow() + trust_duration
         
         db.session.commit()
         
@@ -180,3 +214,7 @@ class DeviceFingerprintService:
             return "tablet"
         else:
             return "desktop"
+
+
+# Singleton instance
+device_service = DeviceFingerprintService()
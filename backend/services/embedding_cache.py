@@ -0,0 +1,61 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Process-wide LRU of deserialized biometric templates.
+    - get(kind, user_id, blob, loader, version=None)
+                          -> read-only array for this exact blob (or version)
+    - invalidate(user_id) -> drop every cached template of a user
+
+    Entries are keyed by (kind, user_id) and remember a digest of the blob
+    they were built from, so a re-enrolled template is never served stale.
+    Callers holding a parsed object rather than bytes pass an explicit
+    `version` (e.g. the enrollment timestamp) instead of having it hashed.
+    """
+
+    MAX_ENTRIES = 4096
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- public API ----------
+
+    def get(self, kind: str, user_id: int, blob, loader, version=None) -> np.ndarray:
+        key = (kind, user_id)
+        digest = self._digest(blob) if version is None else version
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == digest:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        array = loader(blob)
+        array.flags.writeable = False  # shared between requests
+        with self._lock:
+            self._entries[key] = (digest, array)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return array
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == user_id]:
+                del self._entries[key]
+
+    # ---------- internal helpers ----------
+
+    @staticmethod
+    def _digest(blob) -> bytes:
+        if isinstance(blob, str):
+            blob = blob.encode()
+        return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+embedding_cache = EmbeddingCache()
@@ -2,20 +2,40 @@
 import face_recognition
 import cv2
 import numpy as np
-import base64
+import binascii
 from PIL import Image
 import io
 import json
 import os
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import atexit
 import hashlib
+import logging
+import math
+import multiprocessing
+import threading
 
 
+logger = logging.getLogger(__name__)
+
 # Storage directory for face images
 FACE_STORAGE_DIR = Path("stored_face_data")
 FACE_STORAGE_DIR.mkdir(exist_ok=True)
 
+NO_FACE_ERROR = "No face detected. Please ensure your face is visible and well-lit."
+MULTIPLE_FACES_ERROR = "Multiple faces detected. Please ensure only one person is in frame."
+NO_FEATURES_ERROR = "Could not extract facial features. Please try again with better lighting."
+
+# dlib holds the GIL through HOG detection and ResNet encoding; once
+# start_encoder_pool() has run they go to worker processes instead
+_encoder_pool = None
+_encoder_pool_lock = threading.Lock()
+_encoder_workers = 0
+_encoder_timeout = None
+
 
 class AdvancedFaceService:
     """
@@ -23,6 +43,7 @@ class AdvancedFaceService:
     """
     
     DETECTION_MODEL = "hog"  # 'hog' is faster, 'cnn' is more accurate
+    DETECTION_MAX_SIDE = 640  # HOG cost is O(pixels); detect on a copy no larger than this
     ENCODING_MODEL = "large"  # Use large model for 128-dim embeddings
     
     # ✅ BALANCED THRESHOLDS (~90% security)
@@ -31,25 +52,47 @@ class AdvancedFaceService:
     MIN_COSINE_SIMILARITY = 0.80  # Cosine similarity must be > 0.80
 
 
+    @staticmethod
+    def decode_image(base64_image):
+        """Decodes a (data-URL or bare) base64 image into an RGB uint8 array"""
+        data = base64_image.encode('ascii') if isinstance(base64_image, str) else base64_image
+        start = data.find(b'base64,')
+        # Decode past the data-URL prefix in place instead of splitting off a copy
+        view = memoryview(data)[start + 7:] if start != -1 else memoryview(data)
+        raw = binascii.a2b_base64(view)
+        
+        # libjpeg-turbo/libpng via OpenCV straight into an array; always 3-channel,
+        # EXIF orientation left alone as PIL did
+        bgr = cv2.imdecode(
+            np.frombuffer(raw, dtype=np.uint8),
+            cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION,
+        )
+        if bgr is not None:
+            return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        
+        # Formats OpenCV cannot read (e.g. GIF) still go through PIL
+        image = Image.open(io.BytesIO(raw))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return np.asarray(image)
+
+
     @staticmethod
     def save_face_image(base64_image, user_id, username):
         """Saves enrolled face image to storage directory"""
-        print(f"\n💾 [SAVE] Saving face image for user_id={user_id}, username={username}")
-        
         try:
-            # Decode base64
-            if 'base64,' in base64_image:
-                base64_image = base64_image.split('base64,')[1]
-            
-            image_data = base64.b64decode(base64_image)
-            image = Image.open(io.BytesIO(image_data))
-            
-            print(f"📊 [IMAGE] Mode: {image.mode}, Size: {image.size}")
-            
-            # Ensure RGB format
-            if image.mode != 'RGB':
-                print(f"🔄 [CONVERT] Converting {image.mode} → RGB")
-                image = image.convert('RGB')
+            image = AdvancedFaceService.decode_image(base64_image)
+        except Exception as e:
+            logger.warning("[SAVE] Could not decode face image: %s", e)
+            return None, str(e)
+        return AdvancedFaceService.save_face_array(image, user_id, username)
+
+
+    @staticmethod
+    def save_face_array(image, user_id, username):
+        """Saves an already decoded RGB face image to storage directory"""
+        try:
+            image = Image.fromarray(image)
             
             # Generate unique filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -59,13 +102,12 @@ class AdvancedFaceService:
             # Save as JPEG
             image.save(file_path, "JPEG", quality=95)
             
-            print(f"✅ [SAVED] {file_path}")
-            print(f"📏 [SIZE] {os.path.getsize(file_path)} bytes\n")
+            logger.debug("[SAVE] %s (user_id=%s)", file_path, user_id)
             
             return str(file_path), None
             
         except Exception as e:
-            print(f"❌ [ERROR] Save failed: {str(e)}\n")
+            logger.warning("[SAVE] Saving face image failed: %s", e)
             return None, str(e)
 
 
@@ -75,104 +117,73 @@ class AdvancedFaceService:
         Extracts 128-dimensional face embedding with validation.
         Returns: (embedding, error, saved_path)
         """
-        print("\n" + "=" * 60)
-        print("🔍 [EXTRACT] Starting face embedding extraction")
-        print(f"👤 [USER] user_id={user_id}, username={username}")
+        try:
+            # Decode base64 image once; detection, encoding and saving share it
+            image = AdvancedFaceService.decode_image(base64_image)
+        except Exception as e:
+            logger.debug("[DECODE] Invalid face image: %s", e)
+            return None, f"Face processing error: {str(e)}", None
         
+        return AdvancedFaceService.extract_embedding_from_array(
+            image, user_id=user_id, username=username, save_image=save_image
+        )
+
+
+    @staticmethod
+    def extract_embedding_from_array(image, user_id=None, username=None, save_image=True):
+        """
+        Same as extract_embedding() for an already decoded RGB uint8 array.
+        Returns: (embedding, error, saved_path)
+        """
         saved_image_path = None
         start_time = datetime.now()
         
         try:
-            # Decode base64 image
-            print("📥 [DECODE] Decoding base64 image...")
-            if 'base64,' in base64_image:
-                base64_image = base64_image.split('base64,')[1]
-            
-            image_data = base64.b64decode(base64_image)
-            image = np.array(Image.open(io.BytesIO(image_data)))
-            
-            print(f"📊 [IMAGE] Shape: {image.shape}, dtype: {image.dtype}")
-            
-            # Convert RGBA to RGB if needed
-            if len(image.shape) == 3 and image.shape[2] == 4:
-                print("⚠️  [CONVERT] Converting RGBA → RGB...")
-                image = image[:, :, :3]
-                print(f"✅ [CONVERT] New shape: {image.shape}")
-            
-            # Detect faces
-            print(f"🔎 [DETECT] Detecting faces (model: {AdvancedFaceService.DETECTION_MODEL})...")
-            detect_start = datetime.now()
-            
-            face_locations = face_recognition.face_locations(
-                image, 
-                model=AdvancedFaceService.DETECTION_MODEL
-            )
-            
-            detect_duration = (datetime.now() - detect_start).total_seconds()
-            print(f"⏱️  [TIMING] Detection: {detect_duration:.2f}s")
-            
-            # Validate detection
-            if not face_locations:
-                print("⚠️  [NO FACE] No face detected")
-                print("=" * 60 + "\n")
-                return None, "No face detected. Please ensure your face is visible and well-lit.", None
-            
-            if len(face_locations) > 1:
-                print(f"⚠️  [MULTIPLE] {len(face_locations)} faces detected")
-                print("=" * 60 + "\n")
-                return None, "Multiple faces detected. Please ensure only one person is in frame.", None
-            
-            print(f"✅ [DETECTED] Face location: {face_locations[0]}")
-            
-            # Extract face embeddings
-            print(f"🧬 [ENCODE] Extracting embeddings (model: {AdvancedFaceService.ENCODING_MODEL})...")
-            encode_start = datetime.now()
-            
-            face_encodings = face_recognition.face_encodings(
-                image, 
-                known_face_locations=face_locations, 
-                model=AdvancedFaceService.ENCODING_MODEL
-            )
-            
-            encode_duration = (datetime.now() - encode_start).total_seconds()
-            print(f"⏱️  [TIMING] Encoding: {encode_duration:.2f}s")
-            
-            if not face_encodings:
-                print("❌ [FAILED] Could not extract facial features")
-                print("=" * 60 + "\n")
-                return None, "Could not extract facial features. Please try again with better lighting.", None
-            
-            embedding = face_encodings[0]
+            # Detect and encode (in a worker process once the encoder pool is started)
+            face_location, embedding, error = locate_and_encode(image)
             
-            # Quality check - Generate unique hash for this embedding
-            embedding_hash = hashlib.sha256(embedding.tobytes()).hexdigest()[:16]
-            
-            print(f"✅ [SUCCESS] Embedding extracted")
-            print(f"📊 [SHAPE] {embedding.shape}")
-            print(f"📈 [STATS] Mean: {np.mean(embedding):.4f}, Std: {np.std(embedding):.4f}")
-            print(f"🔑 [HASH] {embedding_hash}")
+            if error:
+                logger.debug("[EXTRACT] %s (user_id=%s)", error, user_id)
+                return None, error, None
             
             # Save image if requested
             if save_image and user_id and username:
-                saved_image_path, _ = AdvancedFaceService.save_face_image(
-                    base64_image, user_id, username
+                saved_image_path, _ = AdvancedFaceService.save_face_array(
+                    image, user_id, username
                 )
             
-            total_duration = (datetime.now() - start_time).total_seconds()
-            print(f"⏱️  [TOTAL] {total_duration:.2f}s")
-            print("✅ [COMPLETE] Extraction successful")
-            print("=" * 60 + "\n")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "[EXTRACT] user_id=%s image %s, face %s, embedding hash %s, %.2fs",
+                    user_id, image.shape, face_location,
+                    hashlib.sha256(embedding.tobytes()).hexdigest()[:16],
+                    (datetime.now() - start_time).total_seconds(),
+                )
             
             return embedding, None, saved_image_path
             
         except Exception as e:
-            print(f"❌ [ERROR] {str(e)}")
-            import traceback
-            traceback.print_exc()
-            print("=" * 60 + "\n")
+            logger.exception("[EXTRACT] Face processing failed")
             return None, f"Face processing error: {str(e)}", None
 
 
+    @staticmethod
+    def compare_pair(known_embedding, test_embedding):
+        """
+        Euclidean distance and cosine similarity of two single embeddings.
+        Three dot products and scalar math; no temporaries or per-call array setup.
+        Returns: (distance, cosine) as floats
+        """
+        a = np.asarray(known_embedding, dtype=np.float32)
+        b = np.asarray(test_embedding, dtype=np.float32)
+        dot = float(a @ b)
+        a_sq = float(a @ a)
+        b_sq = float(b @ b)
+        distance = math.sqrt(max(a_sq + b_sq - 2.0 * dot, 0.0))
+        cosine = dot / (math.sqrt(a_sq * b_sq) + 1e-10)
+        return distance, cosine
+
+
     @staticmethod
     def verify_faces(known_embedding, test_embedding, threshold=None):
         """
@@ -182,22 +193,13 @@ class AdvancedFaceService:
         2. Confidence >= 90%
         3. Cosine similarity > 0.80
         """
-        print("\n" + "=" * 60)
-        print("🔐 [VERIFY] Starting BALANCED face verification (~90%)")
-        
         if threshold is None:
             threshold = AdvancedFaceService.DISTANCE_THRESHOLD
         
-        print(f"🎯 [CRITERIA]")
-        print(f"   1. Distance < {threshold}")
-        print(f"   2. Confidence >= {AdvancedFaceService.MIN_CONFIDENCE}%")
-        print(f"   3. Cosine Similarity > {AdvancedFaceService.MIN_COSINE_SIMILARITY}")
-        
         try:
-            start_time = datetime.now()
+            distance, cosine_similarity = AdvancedFaceService.compare_pair(known_embedding, test_embedding)
             
-            # ✅ METRIC 1: Face Distance (primary metric from face_recognition library)
-            distance = face_recognition.face_distance([known_embedding], test_embedding)[0]
+            # ✅ METRIC 1: Face Distance (Euclidean, as face_recognition.face_distance computes it)
             
             # ✅ METRIC 2: Confidence Percentage
             if distance < threshold:
@@ -205,14 +207,8 @@ class AdvancedFaceService:
             else:
                 confidence = 0
             
-            # ✅ METRIC 3: Cosine Similarity (secondary validation)
-            dot_product = np.dot(known_embedding, test_embedding)
-            norm_known = np.linalg.norm(known_embedding)
-            norm_test = np.linalg.norm(test_embedding)
-            cosine_similarity = dot_product / (norm_known * norm_test + 1e-10)
-            
-            # ✅ METRIC 4: Euclidean Distance (tertiary validation)
-            euclidean_dist = np.linalg.norm(known_embedding - test_embedding)
+            # ✅ METRIC 3: Cosine Similarity (secondary validation, from the same dot products)
+            # ✅ METRIC 4: Euclidean Distance is the same quantity as metric 1
             
             # ✅ BALANCED DECISION: ALL criteria must be met
             criterion_1 = distance < threshold
@@ -221,54 +217,38 @@ class AdvancedFaceService:
             
             is_match = criterion_1 and criterion_2 and criterion_3
             
-            duration = (datetime.now() - start_time).total_seconds()
-            
-            print(f"\n📊 [METRICS]")
-            print(f"   Face Distance:      {distance:.6f} {'✅' if criterion_1 else '❌'}")
-            print(f"   Confidence:         {confidence:.2f}% {'✅' if criterion_2 else '❌'}")
-            print(f"   Cosine Similarity:  {cosine_similarity:.6f} {'✅' if criterion_3 else '❌'}")
-            print(f"   Euclidean Distance: {euclidean_dist:.6f}")
-            print(f"   Timing:             {duration:.4f}s")
-            
-            print(f"\n🎯 [DECISION] Match: {is_match}")
-            
-            if is_match:
-                print(f"✅ [SUCCESS] All criteria met - Faces match!")
-                print(f"   Confidence: {confidence:.2f}%")
-            else:
-                print(f"❌ [FAILED] Criteria not met - Faces do NOT match")
-                if not criterion_1:
-                    print(f"   ❌ Distance too high: {distance:.4f} >= {threshold}")
-                if not criterion_2:
-                    print(f"   ❌ Confidence too low: {confidence:.2f}% < {AdvancedFaceService.MIN_CONFIDENCE}%")
-                if not criterion_3:
-                    print(f"   ❌ Cosine similarity too low: {cosine_similarity:.4f} <= {AdvancedFaceService.MIN_COSINE_SIMILARITY}")
-            
-            print("=" * 60 + "\n")
+            logger.debug(
+                "[VERIFY] match=%s distance=%.4f (<%s: %s) confidence=%.2f%% (>=%s: %s) "
+                "cosine=%.4f (>%s: %s)",
+                is_match, distance, threshold, criterion_1,
+                confidence, AdvancedFaceService.MIN_CONFIDENCE, criterion_2,
+                cosine_similarity, AdvancedFaceService.MIN_COSINE_SIMILARITY, criterion_3,
+            )
             
             return is_match, confidence, distance
             
-        except Exception as e:
-            print(f"❌ [ERROR] Verification failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            print("=" * 60 + "\n")
+        except Exception:
+            logger.exception("[VERIFY] Face verification failed")
             return False, 0.0, 1.0
 
 
     @staticmethod
     def serialize_embedding(embedding):
-        """Converts numpy array to JSON string for database storage"""
-        return json.dumps(embedding.tolist())
+        """Converts numpy array to float32 bytes for database storage"""
+        # Not fp16/int8: DISTANCE_THRESHOLD is an absolute Euclidean bound, and
+        # per-vector int8 scaling shifts 128-d distances by ~0.01 near it
+        return np.asarray(embedding, dtype=np.float32).tobytes()
 
 
     @staticmethod
-    def deserialize_embedding(json_string):
-        """Converts JSON string back to numpy array"""
+    def deserialize_embedding(data):
+        """Converts stored bytes (or a legacy JSON string) back to numpy array"""
         try:
-            return np.array(json.loads(json_string))
+            if isinstance(data, str):
+                return np.array(json.loads(data), dtype=np.float32)
+            return np.frombuffer(data, dtype=np.float32)
         except Exception as e:
-            print(f"❌ [DESERIALIZE ERROR] {str(e)}")
+            logger.warning("[DESERIALIZE] Invalid face encoding: %s", e)
             raise Exception("Invalid face encoding data. Please re-enroll face.")
 
 
@@ -280,25 +260,122 @@ class AdvancedFaceService:
             try:
                 os.remove(file_path)
                 deleted += 1
-                print(f"🗑️  Deleted: {file_path}")
             except Exception as e:
-                print(f"⚠️  Could not delete {file_path}: {str(e)}")
+                logger.warning("[DELETE] Could not delete %s: %s", file_path, e)
         return deleted
 
 
+def _detect_faces(image):
+    """
+    HOG face boxes for a full-resolution image, found on a downscaled copy.
+    Boxes are mapped back so encoding still crops from the full-resolution frame.
+    """
+    height, width = image.shape[:2]
+    scale = AdvancedFaceService.DETECTION_MAX_SIDE / max(height, width)
+    if scale >= 1.0:
+        return face_recognition.face_locations(image, model=AdvancedFaceService.DETECTION_MODEL)
+    
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    boxes = face_recognition.face_locations(small, model=AdvancedFaceService.DETECTION_MODEL)
+    return [
+        (
+            max(int(top / scale), 0),
+            min(int(right / scale), width),
+            min(int(bottom / scale), height),
+            max(int(left / scale), 0),
+        )
+        for top, right, bottom, left in boxes
+    ]
+
+
+def _locate_and_encode(image):
+    """
+    Detect faces in an RGB array and encode the single face found.
+    Runs in the request thread or a pool worker. Returns (location, embedding, error).
+    """
+    face_locations = _detect_faces(image)
+    
+    # Validate detection
+    if not face_locations:
+        return None, None, NO_FACE_ERROR
+    
+    if len(face_locations) > 1:
+        return None, None, MULTIPLE_FACES_ERROR
+    
+    # Extract face embeddings
+    face_encodings = face_recognition.face_encodings(
+        image, 
+        known_face_locations=face_locations, 
+        model=AdvancedFaceService.ENCODING_MODEL
+    )
+    
+    if not face_encodings:
+        return None, None, NO_FEATURES_ERROR
+    
+    return face_locations[0], face_encodings[0], None
+
+
+def _new_encoder_pool(workers):
+    # Each worker loads dlib's models once, when it imports this module
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+    )
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
+
+
+def start_encoder_pool(workers, timeout=30.0):
+    """
+    Move detection/encoding into `workers` persistent processes (0 keeps it inline).
+    A job not finished within `timeout` seconds is redone in the request thread.
+
+    Called from the production entrypoint (wsgi.py) only. Workers are spawned, not
+    forked, from a threaded server, and spawn re-imports the parent's __main__;
+    `python app.py` must therefore never start the pool.
+    """
+    global _encoder_pool, _encoder_workers, _encoder_timeout
+    if workers <= 0:
+        return
+    with _encoder_pool_lock:
+        if _encoder_pool is None:
+            _encoder_workers, _encoder_timeout = workers, timeout
+            _encoder_pool = _new_encoder_pool(workers)
+
+
+def _replace_broken_pool(broken):
+    """Swap in a fresh pool after a worker died (once, however many threads noticed)"""
+    global _encoder_pool
+    with _encoder_pool_lock:
+        if _encoder_pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            _encoder_pool = _new_encoder_pool(_encoder_workers)
+
+
+def locate_and_encode(image):
+    """_locate_and_encode() in the worker pool if one was started, else inline"""
+    pool = _encoder_pool
+    if pool is None:
+        return _locate_and_encode(image)
+    try:
+        future = pool.submit(_locate_and_encode, image)
+        return future.result(timeout=_encoder_timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        logger.warning("[EXTRACT] Encoder pool timed out after %ss; encoding inline", _encoder_timeout)
+    except BrokenProcessPool:
+        logger.error("[EXTRACT] Encoder pool worker died; restarting pool, encoding inline")
+        _replace_broken_pool(pool)
+    return _locate_and_encode(image)
+
+
 # Create singleton instance
 face_service = AdvancedFaceService()
 
 
 # Service initialization message
-print("\n" + "=" * 60)
-print("🚀 [INIT] Face Recognition Service Initialized")
-print(f"🔐 [MODE] BALANCED VERIFICATION (~90% Security)")
-print(f"📁 [STORAGE] {FACE_STORAGE_DIR.absolute()}")
-print(f"🔧 [CONFIG] Detection Model: {AdvancedFaceService.DETECTION_MODEL}")
-print(f"🔧 [CONFIG] Encoding Model: {AdvancedFaceService.ENCODING_MODEL}")
-print(f"🎯 [THRESHOLDS]")
-print(f"   Distance: < {AdvancedFaceService.DISTANCE_THRESHOLD}")
-print(f"   Confidence: >= {AdvancedFaceService.MIN_CONFIDENCE}%")
-print(f"   Cosine Similarity: > {AdvancedFaceService.MIN_COSINE_SIMILARITY}")
-print("=" * 60 + "\n")
+logger.info("[INIT] Face recognition service ready (storage %s)", FACE_STORAGE_DIR.absolute())
+logger.debug("[CONFIG] detection=%s encoding=%s distance<%s confidence>=%s%% cosine>%s",
+             AdvancedFaceService.DETECTION_MODEL, AdvancedFaceService.ENCODING_MODEL,
+             AdvancedFaceService.DISTANCE_THRESHOLD, AdvancedFaceService.MIN_CONFIDENCE,
+             AdvancedFaceService.MIN_COSINE_SIMILARITY)
@@ -5,6 +5,9 @@ from datetime import datetime
 from pathlib import Path
 import os
 import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # Storage directory
@@ -25,7 +28,7 @@ class AdvancedGestureService:
     def save_gesture_pattern(gesture_data, user_id, username):
         """Save gesture pattern to storage"""
         try:
-            print(f"\n💾 [SAVE] Saving gesture for user_id={user_id}, username={username}")
+            logger.debug("[SAVE] Saving gesture for user_id=%s, username=%s", user_id, username)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"user_{user_id}_{username}_{timestamp}_gesture.json"
@@ -34,21 +37,19 @@ class AdvancedGestureService:
             with open(file_path, 'w') as f:
                 json.dump(gesture_data, f, indent=2)
             
-            print(f"✅ [SAVED] Gesture saved: {file_path}")
-            print(f"📏 [SIZE] {len(json.dumps(gesture_data))} bytes\n")
+            logger.debug("[SAVED] Gesture saved: %s", file_path)
             
             return str(file_path), None
         except Exception as e:
-            print(f"❌ [ERROR] Save failed: {str(e)}\n")
+            logger.error("[SAVE] Gesture save failed: %s", e)
             return None, str(e)
 
 
     @staticmethod
     def extract_features(gesture_data, user_id=None, username=None, save_pattern=True):
         """Extract comprehensive features from gesture data with BALANCED analysis"""
-        print("\n" + "=" * 60)
-        print("✋ [EXTRACT] Starting BALANCED gesture feature extraction")
-        print(f"👤 [USER] user_id={user_id}, username={username}")
+        logger.debug("[EXTRACT] Gesture feature extraction for user_id=%s, username=%s",
+                     user_id, username)
         
         saved_pattern_path = None
         
@@ -68,7 +69,7 @@ class AdvancedGestureService:
             if len(points) > AdvancedGestureService.MAX_POINTS:
                 return None, f"Too many gesture points. Maximum {AdvancedGestureService.MAX_POINTS} allowed", None
             
-            print(f"📊 [POINTS] {len(points)} data points")
+            logger.debug("[POINTS] %d data points", len(points))
             
             # Extract coordinates
             x_coords = []
@@ -90,14 +91,14 @@ class AdvancedGestureService:
             y_coords = np.array(y_coords)
             
             # Extract comprehensive features
-            print("🔍 [FEATURES] Extracting BALANCED gesture features...")
             features = AdvancedGestureService._extract_comprehensive_features(
                 x_coords, y_coords, timestamps, gesture_data
             )
             
-            print(f"✅ [SUCCESS] Extracted {len(features)} features")
-            print(f"📈 [STATS] Mean: {np.mean(features):.4f}, Std: {np.std(features):.4f}")
-            print(f"📊 [NORM] L2 Norm: {np.linalg.norm(features):.4f}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[SUCCESS] Extracted %d features (mean %.4f, std %.4f, L2 %.4f)",
+                             len(features), np.mean(features), np.std(features),
+                             np.linalg.norm(features))
             
             # Save pattern if requested
             if save_pattern and user_id and username:
@@ -105,14 +106,10 @@ class AdvancedGestureService:
                     gesture_data, user_id, username
                 )
             
-            print("=" * 60 + "\n")
             return features, None, saved_pattern_path
             
         except Exception as e:
-            print(f"❌ [ERROR] {str(e)}")
-            import traceback
-            traceback.print_exc()
-            print("=" * 60 + "\n")
+            logger.exception("[EXTRACT] Gesture processing error")
             return None, f"Gesture processing error: {e}", None
 
 
@@ -250,10 +247,9 @@ class AdvancedGestureService:
         # === 8. SHAPE COMPLEXITY ===
         
         # Number of local extrema (peaks and valleys)
-        x_peaks = len([i for i in range(1, len(x_coords)-1) 
-                       if x_coords[i] > x_coords[i-1] and x_coords[i] > x_coords[i+1]])
-        y_peaks = len([i for i in range(1, len(y_coords)-1) 
-                       if y_coords[i] > y_coords[i-1] and y_coords[i] > y_coords[i+1]])
+        x_mid, y_mid = x_coords[1:-1], y_coords[1:-1]
+        x_peaks = int(np.count_nonzero((x_mid > x_coords[:-2]) & (x_mid > x_coords[2:])))
+        y_peaks = int(np.count_nonzero((y_mid > y_coords[:-2]) & (y_mid > y_coords[2:])))
         
         features.extend([x_peaks, y_peaks])
         
@@ -302,28 +298,28 @@ class AdvancedGestureService:
     @staticmethod
     def verify_gestures(known_features, test_features, threshold=None):
         """Verify if two gestures match with BALANCED multi-method comparison (~90%)"""
-        print("\n" + "=" * 60)
-        print("🔐 [VERIFY] Starting BALANCED gesture verification (~90%)")
-        
         if threshold is None:
             threshold = AdvancedGestureService.SIMILARITY_THRESHOLD
         
-        print(f"🎯 [THRESHOLD] {threshold:.2%}")
-        
         try:
             # Ensure same dimensions
             if len(known_features) != len(test_features):
-                print(f"⚠️ [WARNING] Feature dimension mismatch: {len(known_features)} vs {len(test_features)}")
+                logger.warning("[VERIFY] Gesture feature dimension mismatch: %d vs %d",
+                               len(known_features), len(test_features))
                 return False, 0.0, 1.0
             
+            known_features = np.asarray(known_features, dtype=np.float64)
+            test_features = np.asarray(test_features, dtype=np.float64)
+            diff = known_features - test_features
+            
             # Method 1: Cosine Similarity (normalized dot product)
             dot_product = np.dot(known_features, test_features)
-            norm_known = np.linalg.norm(known_features)
-            norm_test = np.linalg.norm(test_features)
-            cosine_similarity = dot_product / (norm_known * norm_test + 1e-10)
+            cosine_similarity = dot_product / (
+                np.sqrt(np.dot(known_features, known_features) * np.dot(test_features, test_features)) + 1e-10
+            )
             
             # Method 2: Euclidean Distance
-            euclidean_dist = np.linalg.norm(known_features - test_features)
+            euclidean_dist = np.sqrt(np.dot(diff, diff))
             euclidean_similarity = 1 / (1 + euclidean_dist)
             
             # Method 3: Correlation Coefficient
@@ -331,7 +327,7 @@ class AdvancedGestureService:
             correlation_similarity = (correlation + 1) / 2  # Scale to [0, 1]
             
             # Method 4: Manhattan Distance
-            manhattan_dist = np.sum(np.abs(known_features - test_features))
+            manhattan_dist = np.sum(np.abs(diff))
             manhattan_similarity = 1 / (1 + manhattan_dist)
             
             # Combined similarity (weighted average)
@@ -348,41 +344,32 @@ class AdvancedGestureService:
             # Check if match
             is_match = similarity >= threshold
             
-            print(f"📏 [COSINE SIMILARITY] {cosine_similarity:.6f}")
-            print(f"📏 [EUCLIDEAN SIMILARITY] {euclidean_similarity:.6f}")
-            print(f"📏 [CORRELATION SIMILARITY] {correlation_similarity:.6f}")
-            print(f"📏 [MANHATTAN SIMILARITY] {manhattan_similarity:.6f}")
-            print(f"📊 [COMBINED SIMILARITY] {similarity:.2%}")
-            print(f"📏 [DISTANCE] {distance:.6f}")
-            print(f"🎯 [RESULT] Match: {is_match}")
-            
-            if is_match:
-                print(f"✅ [SUCCESS] Gestures match! (confidence: {similarity:.2%})")
-            else:
-                print(f"❌ [FAILED] Gestures do not match (similarity: {similarity:.2%} < threshold: {threshold:.2%})")
-            
-            print("=" * 60 + "\n")
+            logger.debug(
+                "[VERIFY] cosine=%.6f euclidean=%.6f correlation=%.6f manhattan=%.6f "
+                "combined=%.4f threshold=%.4f match=%s",
+                cosine_similarity, euclidean_similarity, correlation_similarity,
+                manhattan_similarity, similarity, threshold, is_match,
+            )
             
             return is_match, similarity, distance
             
-        except Exception as e:
-            print(f"❌ [ERROR] Verification failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            print("=" * 60 + "\n")
+        except Exception:
+            logger.exception("[VERIFY] Gesture verification failed")
             return False, 0.0, 1.0
 
 
     @staticmethod
     def serialize_features(features):
-        """Convert features to string for database"""
-        return json.dumps(features.tolist())
+        """Convert features to float32 bytes for database"""
+        return np.asarray(features, dtype=np.float32).tobytes()
 
 
     @staticmethod
-    def deserialize_features(features_str):
-        """Convert string back to numpy array"""
-        return np.array(json.loads(features_str))
+    def deserialize_features(data):
+        """Convert stored bytes (or a legacy JSON string) back to numpy array"""
+        if isinstance(data, str):
+            return np.array(json.loads(data))
+        return np.frombuffer(data, dtype=np.float32)
 
 
     @staticmethod
@@ -401,13 +388,7 @@ class AdvancedGestureService:
 # Create singleton instance
 gesture_service = AdvancedGestureService()
 
-
-# Service initialization
-print("\n" + "=" * 60)
-print("🚀 [INIT] Gesture Recognition Service Initialized")
-print(f"🔐 [MODE] BALANCED VERIFICATION (~90% Security)")
-print(f"📁 [STORAGE] {GESTURE_STORAGE_DIR.absolute()}")
-print(f"🔧 [CONFIG] Threshold: {AdvancedGestureService.SIMILARITY_THRESHOLD:.2%} (BALANCED)")
-print(f"📊 [CONFIG] Points: {AdvancedGestureService.MIN_POINTS}-{AdvancedGestureService.MAX_POINTS}")
-print(f"📏 [CONFIG] Feature Size: {AdvancedGestureService.FEATURE_SIZE}")
-print("=" * 60 + "\n")
+logger.info("[INIT] Gesture service ready (threshold %.2f, %d-%d points, %d features, storage %s)",
+            AdvancedGestureService.SIMILARITY_THRESHOLD, AdvancedGestureService.MIN_POINTS,
+            AdvancedGestureService.MAX_POINTS, AdvancedGestureService.FEATURE_SIZE,
+            GESTURE_STORAGE_DIR.absolute())
@@ -1,11 +1,13 @@
 import numpy as np
 import json
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from scipy import stats
 from sklearn.preprocessing import StandardScaler
 from pathlib import Path
-import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Storage directory for keystroke patterns
 KEYSTROKE_STORAGE_DIR = Path("C:/Hoysala/Projects/mfa-authentication-system/backend/stored_keystroke_data")
@@ -23,19 +25,12 @@ class KeystrokeDynamicsAnalyzer:
     def __init__(self):
         self.scaler = StandardScaler()
         self.threshold = self.SIMILARITY_THRESHOLD
-        print("\n" + "=" * 60)
-        print("⌨️  [INIT] Keystroke Dynamics Analyzer Initialized")
-        print(f"🔧 [CONFIG] Similarity Threshold: {self.SIMILARITY_THRESHOLD} (BALANCED)")
-        print(f"🔧 [CONFIG] Min Confidence: {self.MIN_CONFIDENCE}%")
-        print(f"🔧 [CONFIG] Min Samples: {self.MIN_SAMPLES}")
-        print(f"🔧 [CONFIG] Recommended Samples: {self.RECOMMENDED_SAMPLES}")
-        print("=" * 60 + "\n")
     
     @staticmethod
     def save_keystroke_pattern(pattern_data: Dict, user_id: int, username: str) -> Tuple[str, str]:
         """Save keystroke pattern to storage directory"""
         try:
-            print(f"\n💾 [SAVE] Saving keystroke pattern for user_id={user_id}, username={username}")
+            logger.debug("[SAVE] Saving keystroke pattern for user_id=%s, username=%s", user_id, username)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"user_{user_id}_{username}_{timestamp}_keystroke.json"
@@ -44,13 +39,12 @@ class KeystrokeDynamicsAnalyzer:
             with open(file_path, 'w') as f:
                 json.dump(pattern_data, f, indent=2)
             
-            print(f"✅ [SAVED] Keystroke pattern saved: {file_path}")
-            print(f"📏 [SIZE] {os.path.getsize(file_path)} bytes\n")
+            logger.debug("[SAVED] Keystroke pattern saved: %s", file_path)
             
             return str(file_path), None
             
         except Exception as e:
-            print(f"❌ [ERROR] Save failed: {str(e)}\n")
+            logger.error("[SAVE] Keystroke pattern save failed: %s", e)
             return None, str(e)
     
     def convert_events_to_timings(self, events: List[Dict]) -> Dict:
@@ -63,8 +57,6 @@ class KeystrokeDynamicsAnalyzer:
         Returns:
             Dict with timings array
         """
-        print(f"\n🔄 [CONVERT] Converting {len(events)} events to timing format...")
-        
         timings = []
         keydown_map = {}
         last_keyup_time = None
@@ -94,7 +86,7 @@ class KeystrokeDynamicsAnalyzer:
                 last_keyup_time = timestamp
                 del keydown_map[key]
         
-        print(f"✅ [CONVERTED] {len(timings)} timing entries created")
+        logger.debug("[CONVERT] %d events -> %d timing entries", len(events), len(timings))
         
         return {'timings': timings}
     
@@ -111,8 +103,7 @@ class KeystrokeDynamicsAnalyzer:
         - Typing speed and rhythm
         - Pressure variations (from hold time)
         """
-        if log_details:
-            print("\n🔍 [EXTRACT] Extracting keystroke features...")
+        log_details = log_details and logger.isEnabledFor(logging.DEBUG)
         
         # ✅ HANDLE BOTH FORMATS
         if isinstance(keystroke_data, list):
@@ -122,12 +113,9 @@ class KeystrokeDynamicsAnalyzer:
         timings = keystroke_data.get('timings', [])
         
         if not timings or len(timings) < 3:
-            print(f"❌ [ERROR] Insufficient keystroke data: {len(timings)} timings")
+            logger.debug("[EXTRACT] Insufficient keystroke data: %d timings", len(timings))
             raise ValueError("Insufficient keystroke data. Need at least 3 keystrokes.")
         
-        if log_details:
-            print(f"📊 [TIMINGS] {len(timings)} keystroke events")
-        
         # Extract dwell times (how long each key is held)
         dwell_times = [t['holdTime'] for t in timings if 'holdTime' in t and t['holdTime'] > 0]
         
@@ -135,8 +123,8 @@ class KeystrokeDynamicsAnalyzer:
         flight_times = [t['flightTime'] for t in timings if 'flightTime' in t and t['flightTime'] > 0]
         
         if log_details:
-            print(f"⏱️  [DWELL] {len(dwell_times)} dwell times")
-            print(f"✈️  [FLIGHT] {len(flight_times)} flight times")
+            logger.debug("[EXTRACT] %d timings: %d dwell, %d flight",
+                         len(timings), len(dwell_times), len(flight_times))
         
         # Calculate statistical features
         features = []
@@ -153,7 +141,7 @@ class KeystrokeDynamicsAnalyzer:
             features.extend(dwell_features)
             
             if log_details:
-                print(f"📈 [DWELL STATS] Mean: {dwell_features[0]:.2f}ms, Std: {dwell_features[1]:.2f}ms")
+                logger.debug("[DWELL] mean %.2fms, std %.2fms", dwell_features[0], dwell_features[1])
         else:
             features.extend([0, 0, 0, 0, 0])
         
@@ -169,7 +157,7 @@ class KeystrokeDynamicsAnalyzer:
             features.extend(flight_features)
             
             if log_details:
-                print(f"📈 [FLIGHT STATS] Mean: {flight_features[0]:.2f}ms, Std: {flight_features[1]:.2f}ms")
+                logger.debug("[FLIGHT] mean %.2fms, std %.2fms", flight_features[0], flight_features[1])
         else:
             features.extend([0, 0, 0, 0, 0])
         
@@ -195,8 +183,8 @@ class KeystrokeDynamicsAnalyzer:
                 features.extend(rhythm_features)
                 
                 if log_details:
-                    print(f"⚡ [RHYTHM] Typing speed: {typing_speed:.2f} keys/sec")
-                    print(f"📈 [INTERVALS] Mean: {rhythm_features[0]:.2f}ms, Std: {rhythm_features[1]:.2f}ms")
+                    logger.debug("[RHYTHM] %.2f keys/sec, interval mean %.2fms, std %.2fms",
+                                 typing_speed, rhythm_features[0], rhythm_features[1])
             else:
                 features.extend([0, 0, 0])
         else:
@@ -205,12 +193,42 @@ class KeystrokeDynamicsAnalyzer:
         feature_array = np.array(features)
         
         if log_details:
-            print(f"✅ [SUCCESS] Extracted {len(feature_array)} features")
-            print(f"📊 [STATS] Mean: {np.mean(feature_array):.4f}, Std: {np.std(feature_array):.4f}")
+            logger.debug("[EXTRACT] %d features (mean %.4f, std %.4f)",
+                         len(feature_array), np.mean(feature_array), np.std(feature_array))
         
         return feature_array
     
-    def enroll_pattern(self, samples, user_id: int = None, username: str = None) -> Dict:
+    def _feature_matrix(self, samples, log_details: bool, strict: bool):
+        """
+        Extract every sample's features into one (n_samples, n_features) matrix.
+
+        Returns (matrix, first_error). With strict=True the first failing sample
+        raises; otherwise failing samples are skipped and the error is returned.
+        """
+        feature_vectors = []
+        first_error = None
+        for i, sample in enumerate(samples):
+            try:
+                feature_vectors.append(self.extract_features(sample, log_details=log_details))
+            except Exception as e:
+                if strict:
+                    logger.warning("[ENROLL] Sample %d failed: %s", i + 1, e)
+                    raise
+                logger.debug("[ANALYZE] Sample %d skipped: %s", i + 1, e)
+                first_error = first_error or e
+        return np.array(feature_vectors), first_error
+
+    @staticmethod
+    def _matrix_stats(feature_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+        """Column mean/std and the clamped consistency score of a feature matrix"""
+        mean_features = feature_matrix.mean(axis=0)
+        std_features = feature_matrix.std(axis=0)
+        # Consistency: lower std relative to mean is better
+        consistency = 1.0 - np.mean(std_features / (mean_features + 1e-6))
+        return mean_features, std_features, max(0, min(1, consistency))
+
+    def enroll_pattern(self, samples, user_id: int = None, username: str = None,
+                       feature_matrix: np.ndarray = None) -> Dict:
         """
         Create enrollment profile from multiple keystroke samples with detailed logging
         
@@ -218,59 +236,37 @@ class KeystrokeDynamicsAnalyzer:
             samples: List of keystroke data (can be dicts OR lists of events)
             user_id: User ID for storage
             username: Username for storage
+            feature_matrix: Already-extracted features of `samples`, if any
         
         Returns:
             Enrollment profile with statistics
         """
-        print("\n" + "=" * 60)
-        print("⌨️  [ENROLL] Starting keystroke pattern enrollment")
-        print(f"👤 [USER] user_id={user_id}, username={username}")
-        print(f"📊 [SAMPLES] {len(samples)} typing samples provided")
+        logger.debug("[ENROLL] Keystroke enrollment for user_id=%s, username=%s (%d samples)",
+                     user_id, username, len(samples))
         
         start_time = datetime.now()
         
         # Validate sample count
         if len(samples) < self.MIN_SAMPLES:
-            print(f"❌ [ERROR] Insufficient samples: {len(samples)} < {self.MIN_SAMPLES}")
             raise ValueError(f"Need at least {self.MIN_SAMPLES} samples for enrollment")
         
         if len(samples) < self.RECOMMENDED_SAMPLES:
-            print(f"⚠️  [WARNING] Less than recommended samples ({len(samples)} < {self.RECOMMENDED_SAMPLES})")
+            logger.debug("[ENROLL] Fewer than recommended samples (%d < %d)",
+                         len(samples), self.RECOMMENDED_SAMPLES)
         
         # Extract features from all samples
-        print("\n🔍 [EXTRACT] Extracting features from all samples...")
-        feature_vectors = []
-        
-        for i, sample in enumerate(samples):
-            print(f"\n📝 [SAMPLE {i+1}/{len(samples)}]")
-            try:
-                features = self.extract_features(sample, log_details=True)
-                feature_vectors.append(features)
-            except Exception as e:
-                print(f"❌ [ERROR] Sample {i+1} failed: {str(e)}")
-                raise
-        
-        feature_matrix = np.array(feature_vectors)
+        if feature_matrix is None:
+            feature_matrix, _ = self._feature_matrix(samples, log_details=True, strict=True)
         
-        print("\n📊 [ANALYSIS] Computing enrollment statistics...")
-        
-        # Calculate mean and standard deviation for each feature
-        mean_features = np.mean(feature_matrix, axis=0)
-        std_features = np.std(feature_matrix, axis=0)
-        
-        print(f"📈 [MEAN FEATURES] {mean_features[:5]}... (showing first 5)")
-        print(f"📈 [STD FEATURES] {std_features[:5]}... (showing first 5)")
-        
-        # Calculate consistency score (lower std = more consistent)
-        consistency_score = 1.0 - np.mean(std_features / (mean_features + 1e-6))
-        consistency_score = max(0, min(1, consistency_score))
-        
-        print(f"📊 [CONSISTENCY] {consistency_score:.2%}")
+        # Mean, standard deviation and consistency (lower std = more consistent)
+        mean_features, std_features, consistency_score = self._matrix_stats(feature_matrix)
         
         # Build enrollment profile
         profile = {
             'mean_features': mean_features.tolist(),
             'std_features': std_features.tolist(),
+            # Per-feature scale for the verify distance, computed once here
+            'inv_std_features': (1.0 / (std_features + 1e-6)).tolist(),
             'num_samples': len(samples),
             'consistency_score': float(consistency_score),
             'enrolled_at': datetime.utcnow().isoformat(),
@@ -284,54 +280,58 @@ class KeystrokeDynamicsAnalyzer:
         
         duration = (datetime.now() - start_time).total_seconds()
         
-        print(f"\n✅ [SUCCESS] Enrollment completed in {duration:.2f}s")
-        print(f"📊 [PROFILE] {len(samples)} samples, consistency: {consistency_score:.2%}")
-        print("=" * 60 + "\n")
+        logger.debug("[ENROLL] Completed in %.2fs (%d samples, consistency %.2f)",
+                     duration, len(samples), consistency_score)
         
         return profile
     
-    def verify_pattern(self, enrolled_profile: Dict, sample) -> Tuple[bool, float]:
+    @staticmethod
+    def profile_matrix(enrolled_profile: Dict) -> np.ndarray:
+        """Stack an enrolled profile's (mean, 1/std) rows for repeated scoring"""
+        mean_features = np.asarray(enrolled_profile['mean_features'], dtype=np.float64)
+        inv_std = enrolled_profile.get('inv_std_features')
+        if inv_std is None:
+            # Profiles enrolled before inv_std_features was stored
+            inv_std = 1.0 / (np.asarray(enrolled_profile['std_features'], dtype=np.float64) + 1e-6)
+        return np.vstack([mean_features, np.asarray(inv_std, dtype=np.float64)])
+    
+    @staticmethod
+    def _scaled_distance(sample_features: np.ndarray, mean_features: np.ndarray,
+                         inv_std: np.ndarray) -> float:
+        """RMS of the per-feature z-scores (diagonal Mahalanobis distance)"""
+        normalized_diff = (sample_features - mean_features) * inv_std
+        return float(np.sqrt(np.dot(normalized_diff, normalized_diff) / len(normalized_diff)))
+    
+    def verify_pattern(self, enrolled_profile: Dict, sample,
+                       profile_matrix: np.ndarray = None) -> Tuple[bool, float]:
         """
         Verify a keystroke sample against enrolled profile with BALANCED validation
         
         Args:
             enrolled_profile: User's enrolled keystroke profile
             sample: New keystroke sample to verify (dict OR list of events)
+            profile_matrix: Precomputed profile_matrix(enrolled_profile), if cached
         
         Returns:
             (verified: bool, confidence: float)
         """
-        print("\n" + "=" * 60)
-        print("🔐 [VERIFY] Starting BALANCED keystroke verification (~70%)")
-        
         start_time = datetime.now()
         
         try:
             # Extract features from sample
-            print("🔍 [EXTRACT] Extracting features from login sample...")
             sample_features = self.extract_features(sample, log_details=True)
             
             # Get enrolled features
-            print("\n📦 [LOAD] Loading enrolled profile...")
-            mean_features = np.array(enrolled_profile['mean_features'])
-            std_features = np.array(enrolled_profile['std_features'])
-            
-            print(f"✅ [LOADED] Enrolled profile ({len(mean_features)} features)")
-            print(f"📊 [ENROLLED] Consistency: {enrolled_profile.get('consistency_score', 0):.2%}")
+            if profile_matrix is None:
+                profile_matrix = self.profile_matrix(enrolled_profile)
+            mean_features, inv_std = profile_matrix
             
             # Calculate Mahalanobis distance (normalized distance)
-            print("\n📏 [DISTANCE] Calculating Mahalanobis distance...")
-            diff = sample_features - mean_features
-            normalized_diff = diff / (std_features + 1e-6)
-            distance = np.sqrt(np.mean(normalized_diff ** 2))
-            
-            print(f"📏 [DISTANCE] {distance:.6f}")
+            distance = self._scaled_distance(sample_features, mean_features, inv_std)
             
             # Calculate confidence (inverse of distance, normalized to 0-100%)
             confidence = (1.0 / (1.0 + distance)) * 100
             
-            print(f"📊 [CONFIDENCE] {confidence:.2f}%")
-            
             # ✅ BALANCED DECISION: Both criteria must be met
             criterion_1 = distance < self.threshold
             criterion_2 = confidence >= self.MIN_CONFIDENCE
@@ -340,49 +340,31 @@ class KeystrokeDynamicsAnalyzer:
             
             duration = (datetime.now() - start_time).total_seconds()
             
-            print(f"\n🎯 [CRITERIA]")
-            print(f"   Distance < {self.threshold}: {distance:.4f} {'✅' if criterion_1 else '❌'}")
-            print(f"   Confidence >= {self.MIN_CONFIDENCE}%: {confidence:.2f}% {'✅' if criterion_2 else '❌'}")
-            print(f"   Timing: {duration:.4f}s")
-            
-            print(f"\n🎯 [DECISION] Match: {verified}")
-            
-            if verified:
-                print(f"✅ [SUCCESS] Keystroke pattern matches! (confidence: {confidence:.2f}%)")
-            else:
-                print(f"❌ [FAILED] Keystroke pattern does NOT match")
-                if not criterion_1:
-                    print(f"   ❌ Distance too high: {distance:.4f} >= {self.threshold}")
-                if not criterion_2:
-                    print(f"   ❌ Confidence too low: {confidence:.2f}% < {self.MIN_CONFIDENCE}%")
-            
-            print("=" * 60 + "\n")
+            logger.debug(
+                "[VERIFY] distance=%.4f (< %s: %s) confidence=%.2f%% (>= %s%%: %s) "
+                "match=%s in %.4fs",
+                distance, self.threshold, criterion_1, confidence, self.MIN_CONFIDENCE,
+                criterion_2, verified, duration,
+            )
             
             return verified, float(confidence)
             
-        except Exception as e:
-            print(f"❌ [ERROR] Verification failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            print("=" * 60 + "\n")
+        except Exception:
+            logger.exception("[VERIFY] Keystroke verification failed")
             return False, 0.0
     
-    def calculate_pattern_strength(self, samples) -> Dict:
+    def calculate_pattern_strength(self, samples, feature_matrix: np.ndarray = None) -> Dict:
         """
         Calculate the strength/quality of keystroke patterns with detailed analysis
         
         Args:
             samples: List of keystroke samples (can be dicts OR lists of events)
+            feature_matrix: Features of the samples that extracted cleanly, if known
         
         Returns:
             Dictionary with strength metrics and recommendations
         """
-        print("\n" + "=" * 60)
-        print("📊 [ANALYZE] Analyzing keystroke pattern strength")
-        print(f"📝 [SAMPLES] {len(samples)} samples provided")
-        
         if len(samples) < self.MIN_SAMPLES:
-            print(f"❌ [ERROR] Insufficient samples: {len(samples)} < {self.MIN_SAMPLES}")
             result = {
                 'strength': 'weak',
                 'score': 0.0,
@@ -390,65 +372,41 @@ class KeystrokeDynamicsAnalyzer:
                 'num_samples': len(samples),
                 'recommendations': [f'Collect at least {self.MIN_SAMPLES} samples']
             }
-            print("=" * 60 + "\n")
             return result
         
         # Extract features from all samples
-        feature_vectors = []
-        for i, sample in enumerate(samples):
-            try:
-                features = self.extract_features(sample, log_details=False)
-                feature_vectors.append(features)
-            except Exception as e:
-                print(f"⚠️  [WARNING] Sample {i+1} skipped: {str(e)}")
+        if feature_matrix is None:
+            feature_matrix, _ = self._feature_matrix(samples, log_details=False, strict=False)
         
-        if len(feature_vectors) < self.MIN_SAMPLES:
+        if len(feature_matrix) < self.MIN_SAMPLES:
             result = {
                 'strength': 'weak',
                 'score': 0.0,
                 'consistency': 0.0,
-                'num_samples': len(feature_vectors),
+                'num_samples': len(feature_matrix),
                 'recommendations': ['Some samples failed processing']
             }
-            print("=" * 60 + "\n")
             return result
         
-        feature_matrix = np.array(feature_vectors)
-        
-        print(f"✅ [PROCESSED] {len(feature_vectors)} valid samples")
-        
         # Calculate metrics
-        std_features = np.std(feature_matrix, axis=0)
-        mean_features = np.mean(feature_matrix, axis=0)
-        
-        # Consistency: lower std relative to mean is better
-        consistency = 1.0 - np.mean(std_features / (mean_features + 1e-6))
-        consistency = max(0, min(1, consistency))
-        
-        print(f"📊 [CONSISTENCY] {consistency:.2%}")
+        _, _, consistency = self._matrix_stats(feature_matrix)
         
         # Calculate overall strength
         sample_factor = min(len(samples) / self.RECOMMENDED_SAMPLES, 1.0)
         overall_score = (consistency * 0.7) + (sample_factor * 0.3)
         
-        print(f"📈 [SAMPLE FACTOR] {sample_factor:.2%}")
-        print(f"📊 [OVERALL SCORE] {overall_score:.2%}")
-        
         # Determine strength category
         if overall_score >= 0.8:
             strength = 'strong'
-            strength_emoji = '🟢'
         elif overall_score >= 0.6:
             strength = 'good'
-            strength_emoji = '🟡'
         elif overall_score >= 0.4:
             strength = 'moderate'
-            strength_emoji = '🟠'
         else:
             strength = 'weak'
-            strength_emoji = '🔴'
         
-        print(f"\n{strength_emoji} [STRENGTH] {strength.upper()} ({overall_score:.2%})")
+        logger.debug("[ANALYZE] %d valid samples, consistency %.2f, sample factor %.2f -> %s (%.2f)",
+                     len(feature_matrix), consistency, sample_factor, strength, overall_score)
         
         # Generate recommendations
         recommendations = []
@@ -459,11 +417,6 @@ class KeystrokeDynamicsAnalyzer:
         if consistency >= 0.8:
             recommendations.append('Excellent typing consistency!')
         
-        if recommendations:
-            print("\n💡 [RECOMMENDATIONS]")
-            for rec in recommendations:
-                print(f"   • {rec}")
-        
         result = {
             'strength': strength,
             'score': float(overall_score),
@@ -472,9 +425,24 @@ class KeystrokeDynamicsAnalyzer:
             'recommendations': recommendations
         }
         
-        print("=" * 60 + "\n")
-        
         return result
+    
+    def analyze_and_enroll(self, samples, min_score: float,
+                           user_id: int = None, username: str = None) -> Tuple[Dict, Optional[Dict]]:
+        """
+        Strength analysis and enrollment over one feature extraction pass.
+        
+        Returns (analysis, profile); profile is None when the analysis score is
+        below min_score. Enrollment still requires every sample to extract.
+        """
+        feature_matrix, first_error = self._feature_matrix(samples, log_details=False, strict=False)
+        analysis = self.calculate_pattern_strength(samples, feature_matrix=feature_matrix)
+        if analysis['score'] < min_score:
+            return analysis, None
+        if first_error is not None:
+            raise first_error
+        profile = self.enroll_pattern(samples, user_id, username, feature_matrix=feature_matrix)
+        return analysis, profile
 
 # ===========================
 # GLOBAL ANALYZER INSTANCE
@@ -490,24 +458,26 @@ def enroll_keystroke_pattern(samples_data, user_id: int = None, username: str =
     """Enroll keystroke pattern from multiple samples"""
     return keystroke_analyzer.enroll_pattern(samples_data, user_id, username)
 
-def verify_keystroke_pattern(enrolled_profile: Dict, sample_data) -> Tuple[bool, float]:
+def verify_keystroke_pattern(enrolled_profile: Dict, sample_data,
+                             profile_matrix: np.ndarray = None) -> Tuple[bool, float]:
     """Verify keystroke sample against enrolled profile"""
-    return keystroke_analyzer.verify_pattern(enrolled_profile, sample_data)
+    return keystroke_analyzer.verify_pattern(enrolled_profile, sample_data, profile_matrix)
 
 def analyze_pattern_strength(samples_data) -> Dict:
     """Analyze the strength of keystroke patterns"""
     return keystroke_analyzer.calculate_pattern_strength(samples_data)
 
+def analyze_and_enroll_keystroke_pattern(samples_data, min_score: float,
+                                         user_id: int = None, username: str = None):
+    """Analyze and, if strong enough, enroll keystroke samples in one pass"""
+    return keystroke_analyzer.analyze_and_enroll(samples_data, min_score, user_id, username)
+
 # ===========================
 # SERVICE INITIALIZATION
 # ===========================
 
-print("\n" + "=" * 60)
-print("🚀 [INIT] Keystroke Dynamics Service Initialized")
-print(f"🔐 [MODE] BALANCED VERIFICATION (~70% Security)")
-print(f"📁 [STORAGE] {KEYSTROKE_STORAGE_DIR.absolute()}")
-print(f"🔧 [CONFIG] Similarity Threshold: {KeystrokeDynamicsAnalyzer.SIMILARITY_THRESHOLD} (BALANCED)")
-print(f"🔧 [CONFIG] Min Confidence: {KeystrokeDynamicsAnalyzer.MIN_CONFIDENCE}%")
-print(f"🔧 [CONFIG] Min Samples: {KeystrokeDynamicsAnalyzer.MIN_SAMPLES}")
-print(f"🔧 [CONFIG] Recommended Samples: {KeystrokeDynamicsAnalyzer.RECOMMENDED_SAMPLES}")
-print("=" * 60 + "\n")
+logger.info("[INIT] Keystroke service ready (threshold %s, min confidence %s%%, "
+            "%d-%d samples, storage %s)",
+            KeystrokeDynamicsAnalyzer.SIMILARITY_THRESHOLD, KeystrokeDynamicsAnalyzer.MIN_CONFIDENCE,
+            KeystrokeDynamicsAnalyzer.MIN_SAMPLES, KeystrokeDynamicsAnalyzer.RECOMMENDED_SAMPLES,
+            KEYSTROKE_STORAGE_DIR.absolute())
@@ -0,0 +1,82 @@
+import atexit
+import logging
+import threading
+import time
+
+from sqlalchemy import bindparam
+
+from extensions import db
+from models import User
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+    Coalesces users.last_login writes off the request path.
+    - mark()   -> remember the newest login time for a user; never blocks on the DB
+    - flush()  -> write everything pending in one executemany UPDATE
+
+    A daemon thread flushes every FLUSH_INTERVAL seconds (and once at exit),
+    so last_login may lag a successful login by up to that long. Logins are
+    tracked per app and written to the database of the app that recorded them.
+    """
+
+    FLUSH_INTERVAL = 30.0  # seconds
+
+    def __init__(self):
+        self._pending = {}  # (app, user_id) -> datetime of the latest login
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # ---------- public API ----------
+
+    def mark(self, app, user_id: int, stamp) -> None:
+        self._ensure_started()
+        with self._lock:
+            self._pending[app, user_id] = stamp
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        by_app = {}
+        for (app, user_id), stamp in pending.items():
+            by_app.setdefault(app, []).append({'uid': user_id, 'stamp': stamp})
+        for app, rows in by_app.items():
+            self._write(app, rows)
+
+    # ---------- internal helpers ----------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="last-login-flusher", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.FLUSH_INTERVAL)
+            self.flush()
+
+    def _write(self, app, rows: list) -> None:
+        users = User.__table__
+        statement = (
+            users.update()
+            .where(users.c.id == bindparam('uid'))
+            .values(last_login=bindparam('stamp'))
+        )
+        with app.app_context():
+            try:
+                db.session.execute(statement, rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error("[LAST LOGIN] Failed to record %d logins: %s", len(rows), e)
+
+
+last_login_buffer = LastLoginBuffer()
@@ -0,0 +1,96 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from extensions import db
+from models import LoginHistory
+
+logger = logging.getLogger(__name__)
+
+
+class LoginHistoryWriter:
+    """
+    Background writer for LoginHistory rows.
+    - submit()  -> queue a row (dict of column values); never blocks the request
+    - flush()   -> write out anything still queued (runs at interpreter exit)
+
+    A daemon thread drains the queue and inserts up to BATCH_SIZE rows per
+    commit, so auth endpoints never wait on a commit for audit records.
+    Each row is queued with the app that produced it and written to that
+    app's database.
+    """
+
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 0.1  # seconds to wait for a batch to fill
+    MAX_QUEUED = 10_000
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=self.MAX_QUEUED)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # ---------- public API ----------
+
+    def submit(self, app, record: dict) -> None:
+        """Queue one LoginHistory row. Rows in a batch must share the same keys."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((app, record))
+        except queue.Full:
+            logger.warning("[LOG] Login history queue full, dropping record")
+
+    def flush(self) -> None:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    # ---------- internal helpers ----------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="login-history-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(batch) < self.BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: list) -> None:
+        by_app = {}
+        for app, record in batch:
+            by_app.setdefault(app, []).append(record)
+        for app, records in by_app.items():
+            with app.app_context():
+                try:
+                    # Single executemany INSERT per app
+                    db.session.execute(LoginHistory.__table__.insert(), records)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("[LOG] Failed to record %d login attempts: %s", len(records), e)
+
+
+login_history_writer = LoginHistoryWriter()
@@ -1,10 +1,14 @@
 
 import base64
-import io
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 
 import pyotp
 import qrcode
 from flask import current_app
+from qrcode.image.svg import SvgPathFillImage
 
 
 class OTPService:
@@ -12,12 +16,20 @@ class OTPService:
     Stateless TOTP helper.
     - generate_secret()        -> new Base32 secret
     - build_provisioning_uri  -> otpauth:// URI for Google Authenticator etc.
-    - build_qr_data_url       -> data:image/png;base64,... for frontend
+    - build_qr_data_url       -> data:image/svg+xml;base64,... for frontend
+                                 (memoized per URI for QR_CACHE_TTL seconds)
     - verify_otp              -> validate a user-entered code
     - current_code            -> for diagnostics only (do not expose to clients)
     """
 
+    QR_CACHE_TTL = 300.0  # one enrollment flow; the QR image encodes the secret
+    QR_CACHE_SIZE = 1024
+
     def __init__(self):
+        # The enroll screen re-fetches the same QR; the URI only changes on re-enroll
+        self._qr_cache = OrderedDict()
+        self._qr_lock = threading.Lock()
+
         # Defaults; can be overridden by Flask config
         self.default_issuer = "MFA Auth System"
         # window = 1 means current time slice ±1 slice (about ±30s if period=30)
@@ -35,6 +47,19 @@ class OTPService:
             return self.default_valid_window
         return int(current_app.config.get("OTP_VALIDITY_WINDOW", self.default_valid_window))
 
+    @staticmethod
+    def _render_qr(provisioning_uri: str, border: int) -> str:
+        qr = qrcode.QRCode(
+            version=1, box_size=10, border=border, image_factory=SvgPathFillImage
+        )
+        qr.add_data(provisioning_uri)
+        qr.make(fit=True)
+
+        svg_bytes = qr.make_image().to_string()
+
+        b64 = base64.b64encode(svg_bytes).decode("utf-8")
+        return f"data:image/svg+xml;base64,{b64}"
+
     # ---------- public API ----------
 
     @staticmethod
@@ -58,27 +83,33 @@ class OTPService:
         totp = pyotp.TOTP(secret)
         return totp.provisioning_uri(name=account_name, issuer_name=self._issuer())
 
-    @staticmethod
-    def build_qr_data_url(provisioning_uri: str) -> str:
+    def build_qr_data_url(self, provisioning_uri: str, border: int = 4) -> str:
         """
-        Generate a data URL PNG QR code from a provisioning URI.
+        Generate a data URL SVG QR code from a provisioning URI.
         Safe to send directly to the frontend.
+
+        SVG is plain text, so there is no raster/PNG (zlib) encoding step.
         """
         if not provisioning_uri:
             raise ValueError("Missing provisioning URI")
 
-        qr = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr.add_data(provisioning_uri)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        img_bytes = buffer.getvalue()
-
-        b64 = base64.b64encode(img_bytes).decode("utf-8")
-        return f"data:image/png;base64,{b64}"
+        # The cached data URL encodes the otpauth:// secret, so entries live only
+        # as long as an enrollment screen; the digest just keeps keys small
+        key = (hashlib.sha256(provisioning_uri.encode()).digest(), border)
+        now = time.monotonic()
+        with self._qr_lock:
+            entry = self._qr_cache.get(key)
+            if entry is not None and now < entry[0]:
+                self._qr_cache.move_to_end(key)
+                return entry[1]
+
+        data_url = self._render_qr(provisioning_uri, border)
+        with self._qr_lock:
+            self._qr_cache[key] = (now + self.QR_CACHE_TTL, data_url)
+            self._qr_cache.move_to_end(key)
+            if len(self._qr_cache) > self.QR_CACHE_SIZE:
+                self._qr_cache.popitem(last=False)
+        return data_url
 
     def verify_otp(self, secret: str, otp_code: str) -> bool:
         """
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """
+    In-process sliding-window attempt counter.
+    - hit(key, limit, window) -> record an attempt; False once `limit` attempts
+                                 were already made within the last `window` seconds
+    - exceeded(key, limit, window) -> True if `limit` attempts were already made
+                                      within `window` seconds (records nothing)
+    - reset(key)              -> forget all attempts for a key
+
+    State is per process; each worker enforces its own window.
+    """
+
+    MAX_KEYS = 100_000
+
+    def __init__(self):
+        self._hits = {}
+        self._lock = threading.Lock()
+
+    # ---------- public API ----------
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._hits.get(key)
+            if attempts is None:
+                if len(self._hits) >= self.MAX_KEYS:
+                    self._prune(now, window)
+                attempts = self._hits[key] = deque()
+            while attempts and now - attempts[0] >= window:
+                attempts.popleft()
+            if len(attempts) >= limit:
+                return False
+            attempts.append(now)
+            return True
+
+    def exceeded(self, key: str, limit: int, window: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._hits.get(key)
+            if not attempts:
+                return False
+            while attempts and now - attempts[0] >= window:
+                attempts.popleft()
+            return len(attempts) >= limit
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._hits.pop(key, None)
+
+    # ---------- internal helpers ----------
+
+    def _prune(self, now: float, window: float) -> None:
+        stale = [k for k, v in self._hits.items() if not v or now - v[-1] >= window]
+        for key in stale:
+            del self._hits[key]
+
+
+login_rate_limiter = RateLimiter()
+mfa_failure_limiter = RateLimiter()
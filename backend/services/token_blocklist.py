@@ -0,0 +1,68 @@
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from extensions import db
+from models import RevokedToken
+
+
+class TokenBlocklist:
+    """
+    Revoked JWT ids for one app, held in memory.
+    - is_revoked(jti)  -> bool, without a database round trip on the request path
+    - revoke(tokens)   -> persist (jti, exp) pairs and block them here at once
+
+    The set is re-read from revoked_tokens every `refresh_interval` seconds, so
+    a logout handled by another worker takes effect here within that window.
+    """
+
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._revoked = frozenset()
+        self._next_reload = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- public API ----------
+
+    def is_revoked(self, jti: str) -> bool:
+        if time.monotonic() >= self._next_reload:
+            self._reload()
+        return jti in self._revoked
+
+    def revoke(self, tokens) -> None:
+        """tokens: iterable of (jti, exp) with exp as a Unix timestamp"""
+        tokens = list(tokens)
+        for jti, exp in tokens:
+            # merge(): logging out twice with the same refresh token is a no-op
+            db.session.merge(RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(exp)))
+        # Expired tokens fail verification anyway; stop tracking them
+        db.session.query(RevokedToken).filter(
+            RevokedToken.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+        with self._lock:
+            self._revoked = self._revoked.union(jti for jti, _ in tokens)
+
+    # ---------- internal helpers ----------
+
+    def _reload(self) -> None:
+        # Held across the query so a concurrent revoke() can't be overwritten
+        # by a snapshot taken before its commit
+        with self._lock:
+            if time.monotonic() < self._next_reload:
+                return
+            self._revoked = frozenset(db.session.scalars(
+                db.select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.utcnow())
+            ))
+            self._next_reload = time.monotonic() + self.refresh_interval
+
+
+def init_app(app):
+    app.extensions['token_blocklist'] = TokenBlocklist(app.config['JWT_BLOCKLIST_REFRESH'])
+
+
+def current_blocklist() -> TokenBlocklist:
+    return current_app.extensions['token_blocklist']
@@ -0,0 +1,60 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifyCache:
+    """
+    Short-lived memo of successful biometric decisions.
+    - get(kind, user_id, payload)         -> cached decision, or None
+    - put(kind, user_id, payload, result) -> remember a matching decision
+    - invalidate(user_id)                 -> forget a user's decisions (re-enroll)
+
+    Clients on flaky connections resubmit the same frame/clip; within TTL
+    seconds the earlier match is reused instead of re-running extraction.
+    Only matches are stored, so a failed attempt is always re-evaluated.
+    """
+
+    TTL = 5.0
+    MAX_ENTRIES = 10_000
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- public API ----------
+
+    def get(self, kind: str, user_id: int, payload: bytes):
+        key = self._key(kind, user_id, payload)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now >= entry[0]:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, kind: str, user_id: int, payload: bytes, result) -> None:
+        key = self._key(kind, user_id, payload)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.TTL, result)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == user_id]:
+                del self._entries[key]
+
+    # ---------- internal helpers ----------
+
+    @staticmethod
+    def _key(kind: str, user_id: int, payload: bytes) -> tuple:
+        return kind, user_id, hashlib.blake2b(payload, digest_size=16).digest()
+
+
+verify_cache = VerifyCache()
@@ -1,7 +1,7 @@
-import base64
+import binascii
 import hashlib
 import io
-import json
+import logging
 import os
 from dataclasses import dataclass
 from datetime import datetime
@@ -12,6 +12,8 @@ from typing import Optional, Tuple
 import numpy as np
 from pydub import AudioSegment   # requires ffmpeg installed
 
+logger = logging.getLogger(__name__)
+
 # -------------------------------------------------------------------
 # Configuration & enums
 # -------------------------------------------------------------------
@@ -38,6 +40,10 @@ FEATURE_SIZE = 320       # extended vector (hash + stats + coarse MFCC‑like)
 MAX_AUDIO_SIZE = 5_000_000
 WAVE_TARGET_SR = 16_000  # 16 kHz mono is standard for speaker tasks
 
+# Frame layout for energy stats, fixed by the target sample rate
+_FRAME_LEN = int(0.025 * WAVE_TARGET_SR)  # 25 ms
+_HOP = int(0.010 * WAVE_TARGET_SR)        # 10 ms
+
 
 @dataclass
 class VerificationResult:
@@ -55,13 +61,22 @@ class VerificationResult:
 # -------------------------------------------------------------------
 
 class AudioDecoder:
+    @staticmethod
+    def decode_base64(base64_audio: str) -> bytes:
+        """Decode a (data-URL or bare) base64 payload without slicing copies of the text."""
+        data = base64_audio.encode("ascii") if isinstance(base64_audio, str) else base64_audio
+        start = data.find(b"base64,")
+        view = memoryview(data)[start + 7:] if start != -1 else memoryview(data)
+        return binascii.a2b_base64(view)
+
     @staticmethod
     def decode_base64_webm_to_waveform(base64_audio: str) -> Tuple[np.ndarray, int]:
         """Decode base64 audio/webm;codecs=opus → mono PCM float32, target 16 kHz."""
-        if "base64," in base64_audio:
-            base64_audio = base64_audio.split("base64,", 1)[1]
+        return AudioDecoder.decode_webm_to_waveform(AudioDecoder.decode_base64(base64_audio))
 
-        raw_bytes = base64.b64decode(base64_audio)
+    @staticmethod
+    def decode_webm_to_waveform(raw_bytes: bytes) -> Tuple[np.ndarray, int]:
+        """Decode raw audio/webm;codecs=opus bytes → mono PCM float32, target 16 kHz."""
         size = len(raw_bytes)
 
         if size == 0:
@@ -117,22 +132,34 @@ class FeatureExtractor:
 
         return np.concatenate(feats, axis=0)
 
+    @staticmethod
+    def _frame_energies(wave: np.ndarray) -> np.ndarray:
+        """RMS of each 25 ms frame (10 ms hop) from one cumulative sum of squares."""
+        starts = np.arange(0, len(wave) - _FRAME_LEN, _HOP)
+        if len(starts) == 0:
+            return np.zeros(1, dtype=np.float32)
+        csum = np.concatenate(([0.0], np.cumsum(np.square(wave, dtype=np.float64))))
+        sums = csum[starts + _FRAME_LEN] - csum[starts]
+        return np.sqrt(np.maximum(sums, 0.0) / _FRAME_LEN).astype(np.float32)
+
     @staticmethod
     def _waveform_stats(wave: np.ndarray) -> np.ndarray:
         """Cheap signal‑domain stats (duration, energy, clipping, spectral tilt proxy)."""
         if len(wave) == 0:
             return np.zeros(16, dtype=np.float32)
 
+        abs_wave = np.abs(wave)
+
         # Basic energy & dynamics
         mean = float(np.mean(wave))
         std = float(np.std(wave))
         rms = float(np.sqrt(np.mean(wave ** 2)))
-        peak = float(np.max(np.abs(wave)))
-        dynamic_range = float(peak - np.min(np.abs(wave)))
+        peak = float(np.max(abs_wave))
+        dynamic_range = float(peak - np.min(abs_wave))
 
         # Clipping ratio
         clip_thr = 0.98
-        clipping_ratio = float(np.mean(np.abs(wave) > clip_thr))
+        clipping_ratio = float(np.mean(abs_wave > clip_thr))
 
         # Coarse “spectral tilt”: low vs high band energy
         n = len(wave)
@@ -144,16 +171,7 @@ class FeatureExtractor:
         tilt = float(low_rms - high_rms)
 
         # Frame‑level stats
-        frame_len = int(0.025 * WAVE_TARGET_SR)  # 25 ms
-        hop = int(0.010 * WAVE_TARGET_SR)        # 10 ms
-        if frame_len <= 0 or hop <= 0:
-            return np.zeros(16, dtype=np.float32)
-
-        energies = []
-        for i in range(0, n - frame_len, hop):
-            frame = wave[i: i + frame_len]
-            energies.append(np.sqrt(np.mean(frame ** 2)))
-        energies = np.array(energies, dtype=np.float32) if len(energies) else np.zeros(1, dtype=np.float32)
+        energies = FeatureExtractor._frame_energies(wave)
 
         feats = np.array([
             mean, std, rms, peak, dynamic_range,
@@ -178,13 +196,17 @@ class FeatureExtractor:
         """
         Decode base64 WebM, build deterministic feature vector, plus quality metrics.
         """
-        # Decode once to bytes for hash features
-        if "base64," in base64_audio:
-            raw_b64 = base64_audio.split("base64,", 1)[1]
-        else:
-            raw_b64 = base64_audio
+        return cls.extract_feature_vector_from_bytes(
+            AudioDecoder.decode_base64(base64_audio), profile=profile
+        )
 
-        audio_bytes = base64.b64decode(raw_b64)
+    @classmethod
+    def extract_feature_vector_from_bytes(
+        cls,
+        audio_bytes: bytes,
+        profile: SecurityProfile = SecurityProfile.BALANCED,
+    ) -> Tuple[np.ndarray, dict]:
+        """Same as extract_feature_vector, for already-decoded WebM bytes."""
         byte_len = len(audio_bytes)
 
         # Size guards per profile
@@ -203,7 +225,7 @@ class FeatureExtractor:
         hash_feats = cls._hash_fingerprints(audio_bytes)
 
         # Decode waveform for signal‑domain stats
-        waveform, _ = AudioDecoder.decode_base64_webm_to_waveform(base64_audio)
+        waveform, _ = AudioDecoder.decode_webm_to_waveform(audio_bytes)
         wave_feats = cls._waveform_stats(waveform)
 
         # Optional coarse “FFT‑like” sample for some frequency texture
@@ -323,24 +345,22 @@ class AdvancedVoiceServiceV2:
     def __init__(self, storage_dir: Path = VOICE_STORAGE_DIR):
         self.storage_dir = storage_dir
 
-        print("\n" + "=" * 60)
-        print("🚀 [INIT] Advanced Voice Recognition Service v2")
-        print(f"📁 [STORAGE] {self.storage_dir.absolute()}")
+        logger.info("[INIT] Voice service v2 ready (storage %s, %d features)",
+                    self.storage_dir.absolute(), FEATURE_SIZE)
         for p, cfg in PROFILE_CONFIG.items():
-            print(f"🔧 [{p.value}] threshold={cfg['threshold']:.2%}, "
-                  f"min_bytes={cfg['min_bytes']}")
-        print(f"📏 [CONFIG] Feature Size: {FEATURE_SIZE}")
-        print("=" * 60 + "\n")
+            logger.debug("[CONFIG] %s: threshold=%.2f, min_bytes=%d",
+                         p.value, cfg['threshold'], cfg['min_bytes'])
 
     # ---------- Storage helpers ----------
 
     def save_voice_sample(
         self, base64_audio: str, user_id: str, username: str
     ) -> str:
-        if "base64," in base64_audio:
-            base64_audio = base64_audio.split("base64,", 1)[1]
+        return self.save_voice_bytes(AudioDecoder.decode_base64(base64_audio), user_id, username)
 
-        audio_bytes = base64.b64decode(base64_audio)
+    def save_voice_bytes(
+        self, audio_bytes: bytes, user_id: str, username: str
+    ) -> str:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"user_{user_id}_{username}_{timestamp}_voice.webm"
         path = self.storage_dir / filename
@@ -349,12 +369,15 @@ class AdvancedVoiceServiceV2:
         return str(path)
 
     @staticmethod
-    def serialize_features(features: np.ndarray) -> str:
-        return ",".join(map(str, features.astype(np.float32)))
+    def serialize_features(features: np.ndarray) -> bytes:
+        return np.asarray(features, dtype=np.float32).tobytes()
 
     @staticmethod
-    def deserialize_features(features_str: str) -> np.ndarray:
-        return np.fromstring(features_str, sep=",", dtype=np.float32)
+    def deserialize_features(data) -> np.ndarray:
+        if isinstance(data, str):
+            # Legacy comma-separated text rows
+            return np.array(data.split(","), dtype=np.float32)
+        return np.frombuffer(data, dtype=np.float32)
 
     def delete_user_audio(self, user_id: str) -> int:
         deleted = 0
@@ -376,13 +399,15 @@ class AdvancedVoiceServiceV2:
         save_audio: bool = True,
         profile: SecurityProfile = SecurityProfile.BALANCED,
     ) -> Tuple[np.ndarray, dict, Optional[str]]:
-        feats, meta = FeatureExtractor.extract_feature_vector(
-            base64_audio, profile=profile
+        # Decode the base64 payload once; features and the saved sample share it
+        audio_bytes = AudioDecoder.decode_base64(base64_audio)
+        feats, meta = FeatureExtractor.extract_feature_vector_from_bytes(
+            audio_bytes, profile=profile
         )
 
         saved_path = None
         if save_audio and user_id and username:
-            saved_path = self.save_voice_sample(base64_audio, user_id, username)
+            saved_path = self.save_voice_bytes(audio_bytes, user_id, username)
 
         return feats, meta, saved_path
 
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend modules the same way app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing', test_config={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    from models import User
+
+    user = User(username='alice', email='alice@example.com')
+    user.set_password('Passw0rd!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    from flask_jwt_extended import create_access_token
+
+    return {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from app import create_app
+from extensions import db
+from models import LoginHistory
+from services.login_history import LoginHistoryWriter
+
+
+def _second_app(tmp_path):
+    other = create_app('testing', test_config={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'other.db'}",
+    })
+    with other.app_context():
+        db.create_all()
+    return other
+
+
+def _history_count(app):
+    with app.app_context():
+        count = LoginHistory.query.count()
+        db.session.remove()
+        return count
+
+
+def test_login_history_rows_go_to_the_submitting_apps_database(app, tmp_path, monkeypatch):
+    other = _second_app(tmp_path)
+    writer = LoginHistoryWriter()
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None)  # flush by hand
+
+    def record():
+        return {'user_id': 1, 'login_time': datetime.utcnow(), 'method_type': 'password',
+                'success': True}
+
+    writer.submit(app, record())
+    writer.submit(other, record())
+    writer.submit(other, record())
+    writer.flush()
+
+    assert _history_count(app) == 1
+    assert _history_count(other) == 2
+
+
+def test_last_login_goes_to_the_marking_apps_database(app, user, tmp_path, monkeypatch):
+    from models import User
+    from services.last_login import LastLoginBuffer
+
+    other = _second_app(tmp_path)
+    buffer = LastLoginBuffer()
+    monkeypatch.setattr(buffer, '_ensure_started', lambda: None)  # flush by hand
+
+    stamp = datetime(2026, 1, 1, 12, 0, 0)
+    buffer.mark(app, user.id, stamp)
+    buffer.mark(other, user.id, datetime(2026, 1, 2))  # no such user there
+    buffer.flush()
+
+    db.session.expire_all()
+    assert db.session.get(User, user.id).last_login == stamp
@@ -0,0 +1,42 @@
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import BackupCode
+from routes.auth import create_mfa_token
+
+
+def _add_codes(user, *codes):
+    for code in codes:
+        backup = BackupCode(user_id=user.id)
+        backup.set_code(code)
+        db.session.add(backup)
+    db.session.commit()
+
+
+def _redeem(client, user, code):
+    return client.post('/api/auth/mfa/verify-backup-code', json={
+        'mfa_token': create_mfa_token(user.id),
+        'backup_code': code,
+    })
+
+
+def test_backup_code_redeems_only_once(client, user):
+    # A second unused code keeps the retry on the "invalid code" path
+    _add_codes(user, 'ABCD1234', 'WXYZ9876')
+
+    assert _redeem(client, user, 'abcd1234').status_code == 200
+
+    second = _redeem(client, user, 'ABCD1234')
+    assert second.status_code == 401
+    assert second.get_json()['error'] == 'Invalid backup code'
+
+
+def test_legacy_werkzeug_hashed_code_still_verifies(client, user):
+    # Codes issued before the HMAC switch were stored as salted werkzeug hashes
+    db.session.add(BackupCode(
+        user_id=user.id, code_hash=generate_password_hash('LEGACY12'),
+    ))
+    db.session.commit()
+
+    assert _redeem(client, user, 'legacy12').status_code == 200
+    assert BackupCode.query.filter_by(user_id=user.id).one().is_used
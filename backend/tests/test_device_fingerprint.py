@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+from app import create_app
+from extensions import db
+from services.device_fingerprint import DeviceFingerprintService
+
+FINGERPRINT = 'canvas:1234|webgl:abcd|tz:UTC'
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+)
+
+
+def _register(service, user):
+    return service.create_or_update_device(user.id, FINGERPRINT, '127.0.0.1', USER_AGENT)
+
+
+def test_upsert_keeps_one_row_per_device(app, user):
+    service = DeviceFingerprintService()
+    first = _register(service, user)
+    second = service.create_or_update_device(user.id, FINGERPRINT, '10.0.0.2', USER_AGENT)
+
+    assert second.id == first.id
+    assert second.ip_address == '10.0.0.2'
+    assert len(service.get_user_devices(user.id)) == 1
+
+
+def test_untrusted_device_is_not_trusted(app, user):
+    service = DeviceFingerprintService()
+    _register(service, user)
+
+    assert service.is_trusted_device(user.id, FINGERPRINT) == (False, None)
+
+
+def test_trusted_device_within_expiry(app, user):
+    service = DeviceFingerprintService()
+    device = _register(service, user)
+    assert service.trust_device(device.id, user.id) == (True, None)
+
+    trusted, found = service.is_trusted_device(user.id, FINGERPRINT)
+    assert trusted is True
+    assert found.id == device.id
+
+
+def test_expired_trust_still_returns_device(app, user):
+    service = DeviceFingerprintService()
+    device = _register(service, user)
+    device.is_trusted = True
+    device.trust_expires_at = datetime.utcnow() - timedelta(minutes=1)
+    db.session.commit()
+
+    trusted, found = service.is_trusted_device(user.id, FINGERPRINT)
+    assert trusted is False
+    assert found is not None and found.id == device.id
+
+
+def test_trust_without_expiry_never_lapses(app, user):
+    service = DeviceFingerprintService()
+    device = _register(service, user)
+    device.is_trusted = True
+    device.trust_expires_at = None
+    db.session.commit()
+
+    trusted, found = service.is_trusted_device(user.id, FINGERPRINT)
+    assert trusted is True
+    assert found.id == device.id
+
+
+def test_trust_duration_follows_each_apps_config(app, user, tmp_path):
+    service = DeviceFingerprintService()
+    device = _register(service, user)
+    service.trust_device(device.id, user.id)
+    assert device.trust_expires_at - datetime.utcnow() > timedelta(days=29)
+
+    # A second app with its own setting is not shadowed by the first one's
+    short_app = create_app('testing', test_config={
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'short.db'}",
+        'DEVICE_TRUST_DURATION': 60,
+    })
+    with short_app.app_context():
+        from models import User
+
+        db.create_all()
+        other = User(username='bob', email='bob@example.com')
+        other.set_password('Passw0rd!')
+        db.session.add(other)
+        db.session.commit()
+
+        device = _register(service, other)
+        service.trust_device(device.id, other.id)
+        assert device.trust_expires_at - datetime.utcnow() <= timedelta(seconds=60)
+        db.session.remove()
@@ -0,0 +1,68 @@
+# Rows enrolled before the float32 BLOB columns hold text; they must still load
+import json
+
+import numpy as np
+from sqlalchemy import text
+
+from extensions import db
+from models import User, VoiceTemplate
+from services import get_voice
+from services.face_recognition import face_service
+from services.gesture_recognition import gesture_service
+
+VECTOR = [0.25, -0.5, 0.125, 1.0]
+
+
+def _reload_user(user_id):
+    db.session.expire_all()
+    return db.session.get(User, user_id)
+
+
+def test_legacy_json_face_encoding_reads_back(app, user):
+    db.session.execute(
+        text('UPDATE users SET face_encoding = :value WHERE id = :id'),
+        {'value': json.dumps(VECTOR), 'id': user.id},
+    )
+    db.session.commit()
+
+    stored = _reload_user(user.id).face_encoding
+    assert isinstance(stored, str)
+    np.testing.assert_array_equal(face_service.deserialize_embedding(stored), VECTOR)
+
+
+def test_legacy_json_gesture_features_read_back(app, user):
+    db.session.execute(
+        text('UPDATE users SET gesture_features = :value WHERE id = :id'),
+        {'value': json.dumps(VECTOR), 'id': user.id},
+    )
+    db.session.commit()
+
+    stored = _reload_user(user.id).gesture_features
+    assert isinstance(stored, str)
+    np.testing.assert_array_equal(gesture_service.deserialize_features(stored), VECTOR)
+
+
+def test_legacy_csv_voice_features_read_back(app, user):
+    db.session.execute(
+        text(
+            'INSERT INTO voice_templates (user_id, features, created_at, updated_at) '
+            'VALUES (:id, :value, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)'
+        ),
+        {'value': ','.join(str(v) for v in VECTOR), 'id': user.id},
+    )
+    db.session.commit()
+    db.session.expire_all()
+
+    stored = VoiceTemplate.query.filter_by(user_id=user.id).one().features
+    assert isinstance(stored, str)
+    voice_service, _ = get_voice()
+    np.testing.assert_array_equal(voice_service.deserialize_features(stored), VECTOR)
+
+
+def test_new_rows_round_trip_as_float32_bytes(app, user):
+    user.face_encoding = face_service.serialize_embedding(np.array(VECTOR))
+    db.session.commit()
+
+    stored = _reload_user(user.id).face_encoding
+    assert isinstance(stored, bytes)
+    np.testing.assert_array_equal(face_service.deserialize_embedding(stored), VECTOR)
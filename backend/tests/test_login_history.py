@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import LoginHistory
+
+
+def _fetch_all_pages(client, headers, limit):
+    ids, params = [], {'limit': limit}
+    while True:
+        response = client.get('/api/user/login-history', query_string=params, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        ids.extend(row['id'] for row in body['history'])
+        if body['next_before'] is None:
+            return ids
+        params = {'limit': limit, **body['next_before']}
+
+
+def test_pages_do_not_skip_rows_with_tied_timestamps(client, user, auth_headers):
+    tied = datetime(2026, 1, 1, 12, 0, 0)
+    rows = [LoginHistory(user_id=user.id, login_time=tied, method_type='password') for _ in range(5)]
+    rows.append(LoginHistory(user_id=user.id, login_time=tied - timedelta(hours=1), method_type='totp'))
+    db.session.add_all(rows)
+    db.session.commit()
+
+    # Page size 2 puts page boundaries inside the run of identical login_times
+    ids = _fetch_all_pages(client, auth_headers, limit=2)
+
+    expected = [row.id for row in sorted(rows, key=lambda r: (r.login_time, r.id), reverse=True)]
+    assert ids == expected
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers):
+    response = client.get('/api/user/login-history?before=yesterday', headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,24 @@
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+
+def _bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_logout_revokes_access_and_refresh_tokens(client, user):
+    access = create_access_token(identity=user.id)
+    refresh = create_refresh_token(identity=user.id)
+
+    response = client.post('/api/auth/logout', json={'refresh_token': refresh}, headers=_bearer(access))
+    assert response.status_code == 200
+
+    assert client.get('/api/user/login-history', headers=_bearer(access)).status_code == 401
+    assert client.post('/api/auth/refresh', headers=_bearer(refresh)).status_code == 401
+
+
+def test_logout_rejects_another_users_refresh_token(client, user):
+    access = create_access_token(identity=user.id)
+    foreign = create_refresh_token(identity=user.id + 1)
+
+    response = client.post('/api/auth/logout', json={'refresh_token': foreign}, headers=_bearer(access))
+    assert response.status_code == 400
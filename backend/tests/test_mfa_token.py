@@ -0,0 +1,67 @@
+import base64
+import json
+import time
+
+import jwt
+import pytest
+
+from routes.auth import MFA_TOKEN_EXPIRY, MFA_TOKEN_SECRET, create_mfa_token, decode_mfa_token
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def test_token_is_readable_by_pyjwt(app):
+    token = create_mfa_token(42)
+
+    claims = jwt.decode(token, MFA_TOKEN_SECRET, algorithms=['HS256'])
+    assert claims['user_id'] == 42
+    assert claims['exp'] - claims['iat'] == MFA_TOKEN_EXPIRY
+
+
+def test_pyjwt_token_is_accepted(app):
+    now = int(time.time())
+    token = jwt.encode(
+        {'user_id': 7, 'iat': now, 'exp': now + 60}, MFA_TOKEN_SECRET, algorithm='HS256'
+    )
+
+    assert decode_mfa_token(token) == 7
+
+
+def test_tampered_payload_is_rejected(app):
+    header, _, signature = create_mfa_token(1).split('.')
+    forged = _b64url(json.dumps({'user_id': 2, 'exp': int(time.time()) + 60}).encode())
+
+    with pytest.raises(Exception, match='Invalid MFA token'):
+        decode_mfa_token(f'{header}.{forged}.{signature}')
+
+
+def test_wrong_key_is_rejected(app):
+    token = jwt.encode(
+        {'user_id': 1, 'exp': int(time.time()) + 60}, 'not-the-mfa-secret', algorithm='HS256'
+    )
+
+    with pytest.raises(Exception, match='Invalid MFA token'):
+        decode_mfa_token(token)
+
+
+def test_expired_token_is_rejected(app):
+    now = int(time.time())
+    token = jwt.encode(
+        {'user_id': 1, 'iat': now - 120, 'exp': now - 60}, MFA_TOKEN_SECRET, algorithm='HS256'
+    )
+
+    with pytest.raises(Exception, match='MFA token expired'):
+        decode_mfa_token(token)
+
+
+@pytest.mark.parametrize('algorithm', ['HS512', 'none'])
+def test_other_algorithms_are_rejected(app, algorithm):
+    key = None if algorithm == 'none' else MFA_TOKEN_SECRET
+    token = jwt.encode(
+        {'user_id': 1, 'exp': int(time.time()) + 60}, key, algorithm=algorithm
+    )
+
+    with pytest.raises(Exception, match='Invalid MFA token'):
+        decode_mfa_token(token)
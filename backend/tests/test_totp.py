@@ -0,0 +1,14 @@
+import pyotp
+import pytest
+
+from routes.auth import verify_totp
+
+
+def test_current_code_verifies():
+    secret = pyotp.random_base32()
+    assert verify_totp(secret, pyotp.TOTP(secret).now())
+
+
+@pytest.mark.parametrize('code', ['１２３４５６', '12345', '1234567', 'abcdef', ''])
+def test_malformed_codes_are_rejected_not_raised(code):
+    assert verify_totp(pyotp.random_base32(), code) is False
@@ -0,0 +1,33 @@
+import sys
+import threading
+import time
+
+# Identical errors get a full traceback at most once per interval (seconds)
+TRACEBACK_INTERVAL = 1.0
+_MAX_TRACKED = 1024
+
+_last_traceback = {}  # "ExcType:message" -> time.monotonic() of last traceback
+_lock = threading.Lock()
+
+
+def log_exception(logger, msg, *args):
+    """Log the active exception, with a traceback only for the first of a burst.
+
+    Call from an ``except`` block. Repeats of the same error within
+    TRACEBACK_INTERVAL are logged as a one-line warning instead, so an outage
+    does not format and write a stack trace on every request.
+    """
+    exc = sys.exc_info()[1]
+    key = f"{type(exc).__name__}:{str(exc)[:64]}"
+    now = time.monotonic()
+    with _lock:
+        sample = now - _last_traceback.get(key, float('-inf')) >= TRACEBACK_INTERVAL
+        if sample:
+            if len(_last_traceback) >= _MAX_TRACKED:
+                _last_traceback.clear()
+            _last_traceback[key] = now
+
+    if sample:
+        logger.exception(msg, *args)
+    else:
+        logger.warning(msg + " (%s: %s)", *args, type(exc).__name__, exc)
@@ -4,6 +4,7 @@ import hashlib
 from cryptography.fernet import Fernet
 import base64
 import os
+import re
 
 
 def hash_password(password):
@@ -69,11 +70,13 @@ class DataEncryption:
         return self.cipher.decrypt(encrypted_data).decode()
 
 
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\-.]')
+
+
 def sanitize_filename(filename):
     """Sanitize filename to prevent directory traversal"""
-    import re
     # Remove any non-alphanumeric characters except dots, dashes, and underscores
-    filename = re.sub(r'[^\w\-.]', '_', filename)
+    filename = _UNSAFE_FILENAME_CHARS.sub('_', filename)
     # Remove any leading dots
     filename = filename.lstrip('.')
     return filename
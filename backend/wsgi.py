@@ -0,0 +1,13 @@
+"""
+WSGI entrypoint for production servers.
+
+    gunicorn -k gthread --threads 8 --workers 4 --worker-tmp-dir /dev/shm wsgi:app
+
+`python app.py` runs the Werkzeug development server and is for local use only.
+The face encoder pool (FACE_WORKERS) is started here and nowhere else.
+"""
+from app import create_app
+from services.face_recognition import start_encoder_pool
+
+app = create_app()
+start_encoder_pool(app.config['FACE_WORKERS'], app.config['FACE_ENCODE_TIMEOUT'])
@@ -41,7 +41,9 @@ const DashboardPage = () => {
 
   const handleLogout = async () => {
     try {
-      await api.post('/auth/logout');
+      await api.post('/auth/logout', {
+        refresh_token: localStorage.getItem('refresh_token'),
+      });
     } catch (_) {}
     localStorage.removeItem('access_token');
     localStorage.removeItem('refresh_token');
@@ -96,7 +96,10 @@ const authService = {
 
   logout: async () => {
     try {
-      await api.post('/api/auth/logout');
+      // Send the refresh token too so it is revoked along with the access token
+      await api.post('/api/auth/logout', {
+        refresh_token: localStorage.getItem('refresh_token'),
+      });
     } catch (error) {
       console.error('Logout error:', error);
     }